@@ -1,35 +1,63 @@
+from dotenv import load_dotenv
+load_dotenv()
+
 from flask import Flask
-from db import init_db
 from flask_cors import CORS
 from routes.auth import auth
 from routes.progress import progress
-from dotenv import load_dotenv
+from routes.ops import ops
+from instrumentation import init_instrumentation
+from profiling import init_profiling
+from compression import init_compression
 from mail_server import init_mail
+from migrations import check_schema_version, db_cli, upgrade, seed
 import os
-import pymysql
 from quiz.quiz import quiz
 
 
-load_dotenv()
-
+def create_app(config=None):
+    """
+    Build the Flask app. Registering blueprints touches neither the database
+    nor the heavy libraries (bcrypt, jwt, flask_mail, pymysql, seed data),
+    which load on first use.
+    """
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY')
+    app.config['SCHEMA_CHECK_ON_STARTUP'] = True
+    if config:
+        app.config.update(config)
+    # Devanagari as UTF-8 (3 bytes per code point) instead of \uXXXX escapes (6)
+    app.json.ensure_ascii = False
+    CORS(app, expose_headers=['X-Next-Cursor', 'Server-Timing'])
+    init_instrumentation(app)
+    init_profiling(app)
+    init_compression(app)
+
+    init_mail(app)
+
+    app.cli.add_command(db_cli)
+
+    app.register_blueprint(auth,     url_prefix='/api')
+    app.register_blueprint(quiz,     url_prefix='/api')
+    app.register_blueprint(progress, url_prefix='/api')
+    app.register_blueprint(ops,      url_prefix='/api')
+
+    # schema changes and seeding run via `flask db upgrade` / `flask db seed`;
+    # workers only confirm the schema is current (one query)
+    if app.config['SCHEMA_CHECK_ON_STARTUP']:
+        import pymysql
+        try:
+            current, latest = check_schema_version()
+            if current < latest:
+                print(f"Database schema at version {current}, latest is {latest}: run `flask db upgrade`")
+        except pymysql.err.MySQLError as e:
+            print("Database check failed:", e)
+
+    return app
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY')
-CORS(app)
-
-init_mail(app)
-
-try:
-    init_db()
-    print("Database initialized successfully!")
-except pymysql.err.OperationalError as e:
-    print("Database connection failed:", e)
-
-app.register_blueprint(auth,     url_prefix='/api')
-app.register_blueprint(quiz,     url_prefix='/api')
-app.register_blueprint(progress, url_prefix='/api')
 
 if __name__ == '__main__':
-	app.run(debug=True)
-
-
+	# local dev convenience: bring the schema and seed up to date first
+	upgrade()
+	seed()
+	create_app().run(debug=True)
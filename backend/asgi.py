@@ -0,0 +1,24 @@
+"""
+ASGI entry point
+================
+Serves the same app under an asyncio server:
+
+    $ pip install uvicorn a2wsgi
+    $ uvicorn asgi:app --host 0.0.0.0 --port 5000
+
+The event loop owns the sockets, so a worker keeps thousands of open
+(mostly idle, keep-alive) learner connections for the cost of a coroutine
+each. Views still run synchronously, on a pool of ``ASGI_THREADS`` threads
+(default 32). The read-heavy catalog endpoints answer from the in-memory
+catalog snapshot and release their thread within microseconds; views that
+hit MySQL hold one thread and one pooled connection, so keep
+``DB_POOL_SIZE`` at least ``ASGI_THREADS``.
+"""
+
+import os
+
+from a2wsgi import WSGIMiddleware
+
+from app import create_app
+
+app = WSGIMiddleware(create_app(), workers=int(os.getenv('ASGI_THREADS', 32)))
@@ -0,0 +1,103 @@
+"""
+Catalog / history response size
+================================
+Fetches the catalog list endpoints through the Flask test client and
+reports the bytes on the wire for each representation:
+
+* ``\\uXXXX`` escaped JSON (the previous default), and UTF-8 JSON
+* gzip, plus brotli when the ``brotli`` package is installed
+* a revalidation with ``If-None-Match`` (304, empty body)
+
+By default the catalog is built from the seed literals in
+``quiz.seed_data``, so no database is needed. ``--from-db`` reads the live
+catalog instead.
+
+    $ python -m bench.bench_compression
+"""
+
+import argparse
+import datetime
+import time
+
+from dotenv import load_dotenv
+
+from compression import _brotli_module
+
+PATHS = (
+    '/api/lessons?limit=200',
+    '/api/lessons?level=easy',
+    '/api/quizzes?limit=200',
+    '/api/quizzes?level=easy',
+)
+
+
+def _seed_snapshot():
+    from quiz.catalog import CatalogSnapshot, catalog_cache
+    from quiz.seed_data import LESSON_SEED_DATA, QUIZ_SEED_DATA, SOURCE_URL
+
+    now = datetime.datetime.now().replace(microsecond=0)
+    lessons = [
+        {'id': i, 'romanized_text': None, **item, 'source_url': SOURCE_URL, 'created_at': now, 'updated_at': now}
+        for i, item in enumerate(LESSON_SEED_DATA, 1)
+    ]
+    first_lesson = {}
+    for row in lessons:
+        first_lesson.setdefault(row['level'], row)
+    quizzes = [
+        {
+            'id': i, 'explanation': None, **item,
+            'lesson_id': first_lesson[item['level']]['id'],
+            'lesson_english_text': first_lesson[item['level']]['english_text'],
+            'source_url': SOURCE_URL, 'created_at': now, 'updated_at': now,
+        }
+        for i, item in enumerate(QUIZ_SEED_DATA, 1)
+    ]
+    catalog_cache._snapshot = CatalogSnapshot(
+        catalog_cache.version, time.monotonic() + 3600, lessons, quizzes,
+    )
+
+
+def _size(client, path, **headers):
+    response = client.get(path, headers=headers)
+    return response.status_code, len(response.get_data()), response.headers.get('ETag')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--from-db', action='store_true', help='use the live catalog, not the seed literals')
+    args = parser.parse_args()
+
+    from app import create_app
+    if not args.from_db:
+        _seed_snapshot()
+    app = create_app({'SCHEMA_CHECK_ON_STARTUP': False})
+    client = app.test_client()
+
+    encodings = ['gzip'] + (['br'] if _brotli_module() is not None else [])
+    columns = ['escaped', 'utf-8'] + encodings + ['304']
+    print(f"{'path':<28}" + ''.join(f'{c:>10}' for c in columns) + f"{'saved':>9}")
+    totals = dict.fromkeys(columns, 0)
+    for path in PATHS:
+        app.json.ensure_ascii = True
+        sizes = {'escaped': _size(client, path)[1]}
+        app.json.ensure_ascii = False
+        _, sizes['utf-8'], etag = _size(client, path)
+        for encoding in encodings:
+            sizes[encoding] = _size(client, path, **{'Accept-Encoding': encoding})[1]
+        status, sizes['304'], _ = _size(client, path, **{'If-None-Match': etag})
+        assert status == 304, status
+
+        best = min(sizes[e] for e in encodings)
+        for column in columns:
+            totals[column] += sizes[column]
+        print(
+            f'{path:<28}' + ''.join(f'{sizes[c]:>10}' for c in columns)
+            + f"{1 - best / sizes['escaped']:>9.1%}"
+        )
+    best = min(totals[e] for e in encodings)
+    print(f"{'total':<28}" + ''.join(f'{totals[c]:>10}' for c in columns) + f"{1 - best / totals['escaped']:>9.1%}")
+
+
+if __name__ == '__main__':
+    load_dotenv()
+    main()
@@ -0,0 +1,116 @@
+"""
+Admin analytics export at scale
+===============================
+Loads ``--users`` synthetic users (with progress summaries) into the
+configured database and fetches ``/api/admin/analytics`` as buffered JSON
+and as the streamed ndjson / csv exports. For each it reports the time to
+the first chunk, the total time, the bytes sent and the peak Python heap
+(tracemalloc) while serving it.
+
+The synthetic rows use the ``@bench-export.local`` email domain and are
+deleted at the end unless ``--keep`` is given (re-runs reuse kept rows).
+
+Run from the backend directory against a migrated database:
+
+    $ python -m bench.bench_export --users 1000000
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from dotenv import load_dotenv
+
+from db import db_cursor
+
+BENCH_DOMAIN = 'bench-export.local'
+INSERT_CHUNK = 5000
+
+
+def _populate(target):
+    with db_cursor() as cursor:
+        cursor.execute('SELECT COUNT(*) AS n FROM users WHERE email LIKE %s', (f'%@{BENCH_DOMAIN}',))
+        have = cursor.fetchone()['n']
+        for start in range(have, target, INSERT_CHUNK):
+            stop = min(start + INSERT_CHUNK, target)
+            cursor.executemany(
+                'INSERT INTO users (name, email, password) VALUES (%s, %s, %s)',
+                [(f'bench {i}', f'user{i}@{BENCH_DOMAIN}', 'x') for i in range(start, stop)],
+            )
+            cursor.connection.commit()
+        cursor.execute(
+            '''
+            INSERT IGNORE INTO user_progress_summary
+                (user_id, total_sessions, total_questions, total_correct, score_sum, best_score_percent)
+            SELECT id, 1 + id % 40, 5 * (1 + id % 40), 3 * (1 + id % 40), 60 * (1 + id % 40), id % 101
+            FROM users WHERE email LIKE %s
+            ''',
+            (f'%@{BENCH_DOMAIN}',),
+        )
+        cursor.connection.commit()
+    return max(target - have, 0)
+
+
+def _cleanup():
+    with db_cursor() as cursor:
+        while True:
+            cursor.execute('DELETE FROM users WHERE email LIKE %s LIMIT %s', (f'%@{BENCH_DOMAIN}', INSERT_CHUNK))
+            cursor.connection.commit()
+            if cursor.rowcount < INSERT_CHUNK:
+                return
+
+
+def _measure(client, fmt):
+    tracemalloc.start()
+    started = time.perf_counter()
+    resp = client.get(f'/api/admin/analytics?format={fmt}', buffered=False)
+    first_chunk = None
+    size = 0
+    for chunk in resp.response:
+        if first_chunk is None and chunk:
+            first_chunk = time.perf_counter() - started
+        size += len(chunk)
+    resp.close()
+    total = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resp.status_code, first_chunk or total, total, size, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=1_000_000)
+    parser.add_argument('--formats', default='json,ndjson,csv')
+    parser.add_argument('--keep', action='store_true', help='leave the synthetic users in place')
+    args = parser.parse_args()
+
+    from app import create_app
+
+    started = time.perf_counter()
+    added = _populate(args.users)
+    print(f'synthetic users: {args.users} ({added} inserted in {time.perf_counter() - started:.1f} s)')
+
+    app = create_app({'SCHEMA_CHECK_ON_STARTUP': False, 'TESTING': True})
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        # an admin session that will not re-check its role mid-run
+        sess['user_id'] = 0
+        sess['role'] = 'admin'
+        sess['role_checked_at'] = int(time.time()) + 86400
+
+    try:
+        print(f"{'format':>7} {'status':>6} {'first chunk s':>14} {'total s':>8} {'MB sent':>8} {'peak heap MB':>13}")
+        for fmt in args.formats.split(','):
+            status, first, total, size, peak = _measure(client, fmt)
+            print(
+                f'{fmt:>7} {status:>6} {first:>14.3f} {total:>8.2f}'
+                f' {size / 1e6:>8.1f} {peak / 1e6:>13.1f}'
+            )
+    finally:
+        if not args.keep:
+            _cleanup()
+
+
+if __name__ == '__main__':
+    load_dotenv()
+    main()
@@ -0,0 +1,76 @@
+"""
+Import-time budget
+==================
+Runs ``python -X importtime -c "import app"`` in a fresh interpreter, prints
+the total and the slowest modules, then times ``create_app()``. Exits
+non-zero if a module that should load lazily (driver, hashing, JWT, mail,
+seed literals) is imported, or if the total exceeds ``--budget-ms``.
+
+Run from the backend directory:
+
+    $ python -m bench.bench_import --budget-ms 400
+"""
+
+import argparse
+import subprocess
+import sys
+
+LAZY_MODULES = ('pymysql', 'bcrypt', 'jwt', 'flask_mail', 'smtplib', 'quiz.seed_data')
+
+CREATE_APP_SNIPPET = '''
+import time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app({'SCHEMA_CHECK_ON_STARTUP': False})
+done = time.perf_counter()
+print(f'{(imported - started) * 1000:.1f} {(done - imported) * 1000:.1f}')
+'''
+
+
+def _importtime():
+    """Return [(cumulative_us, module)] from one -X importtime run."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app'],
+        check=True, capture_output=True, text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative), name.strip()))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--budget-ms', type=float, default=400.0)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    rows = _importtime()
+    total_ms = next(us for us, name in rows if name == 'app') / 1000
+    print(f'import app: {total_ms:.1f} ms cumulative')
+    for us, name in sorted(rows, reverse=True)[:args.top]:
+        print(f'  {us / 1000:8.1f} ms  {name}')
+
+    result = subprocess.run([sys.executable, '-c', CREATE_APP_SNIPPET],
+                            check=True, capture_output=True, text=True)
+    import_ms, create_ms = result.stdout.split()
+    print(f'wall clock: import {import_ms} ms, create_app() {create_ms} ms')
+
+    loaded = {name for _, name in rows}
+    eager = [m for m in LAZY_MODULES if m in loaded]
+    failed = False
+    if eager:
+        print(f'FAIL: imported eagerly: {", ".join(eager)}')
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f'FAIL: {total_ms:.1f} ms over the {args.budget_ms:.0f} ms budget')
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,369 @@
+"""
+Learner flow benchmark
+======================
+Drives the real request sequence of a learner and reports throughput and
+p50/p95/p99 latency per endpoint:
+
+    register -> login -> lessons -> (session start -> submit) x N -> history
+
+Before the run it seeds ``--users`` synthetic learners with ``--sessions``
+completed sessions of five attempts each, so history and progress queries
+see realistic depth. Each of ``--concurrency`` workers then registers a
+fresh account (timing /register), logs in as a seeded learner and plays
+``--rounds`` sessions.
+
+Requests go through the Flask test client in this process by default
+(no server needed, only MySQL); ``--url`` sends them over HTTP to a running
+server instead. Results are written as JSON to ``--out`` and
+``--compare`` prints the change against an earlier results file.
+
+Synthetic rows use the ``@benchflow.local`` email domain and are deleted
+at the end unless ``--keep`` is given.
+
+Run from the backend directory against a migrated, seeded database:
+
+    $ python -m bench.bench_learner_flow --users 2000 --sessions 20 --concurrency 16
+    $ python -m bench.bench_learner_flow --compare bench/results/learner_flow-<stamp>.json
+"""
+
+import argparse
+import http.cookiejar
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+BENCH_DOMAIN = 'benchflow.local'
+BENCH_PASSWORD = 'bench-flow-password'
+QUESTIONS_PER_SESSION = 5
+INSERT_CHUNK = 2000
+OPTIONS = ('A', 'B', 'C', 'D')
+
+
+# ---------------------------------------------------------------------------
+# synthetic data
+# ---------------------------------------------------------------------------
+
+def _seed_population(users, sessions, rng):
+    """Insert synthetic learners with completed history; returns their emails."""
+    from db import db_cursor
+    import password_hasher
+    from routes.progress import rebuild_progress_summary, rebuild_quiz_stats
+
+    # one bcrypt hash shared by every synthetic learner
+    hashed = password_hasher.hash_password(BENCH_PASSWORD)
+    emails = [f'learner{i}@{BENCH_DOMAIN}' for i in range(users)]
+    with db_cursor() as cursor:
+        cursor.execute('SELECT id, level, correct_option FROM quiz')
+        by_level = {}
+        for row in cursor.fetchall():
+            by_level.setdefault(row['level'], []).append(row)
+        levels = [lvl for lvl, rows in by_level.items() if len(rows) >= QUESTIONS_PER_SESSION]
+        if not levels:
+            raise SystemExit('seed the quiz catalog first: flask --app app db seed')
+
+        # keep each attempts insert around INSERT_CHUNK sessions
+        users_per_chunk = max(INSERT_CHUNK // max(sessions, 1), 1)
+        for start in range(0, users, users_per_chunk):
+            chunk = emails[start:start + users_per_chunk]
+            cursor.executemany(
+                'INSERT IGNORE INTO users (name, email, password) VALUES (%s, %s, %s)',
+                [('Bench Learner', email, hashed) for email in chunk],
+            )
+            fmt = ','.join(['%s'] * len(chunk))
+            cursor.execute(
+                f'''
+                SELECT u.id FROM users u
+                WHERE u.email IN ({fmt})
+                  AND NOT EXISTS (SELECT 1 FROM quiz_sessions s WHERE s.user_id = u.id)
+                ORDER BY u.id
+                ''',
+                chunk,
+            )
+            user_ids = [row['id'] for row in cursor.fetchall()]
+            if not user_ids or not sessions:
+                cursor.connection.commit()
+                continue
+
+            planned = []
+            for user_id in user_ids:
+                for _ in range(sessions):
+                    level = rng.choice(levels)
+                    picks = rng.sample(by_level[level], QUESTIONS_PER_SESSION)
+                    answers = [(q['id'], rng.choice(OPTIONS), q['correct_option']) for q in picks]
+                    correct = sum(sel == key for _, sel, key in answers)
+                    planned.append((user_id, level, correct, answers))
+            cursor.executemany(
+                '''
+                INSERT INTO quiz_sessions
+                    (user_id, level, total_questions, correct_answers, score_percent, status, completed_at)
+                VALUES (%s, %s, %s, %s, %s, 'completed', CURRENT_TIMESTAMP)
+                ''',
+                [
+                    (user_id, level, QUESTIONS_PER_SESSION, correct,
+                     round(correct * 100 / QUESTIONS_PER_SESSION, 2))
+                    for user_id, level, correct, _ in planned
+                ],
+            )
+            ids_fmt = ','.join(['%s'] * len(user_ids))
+            cursor.execute(
+                f'SELECT id FROM quiz_sessions WHERE user_id IN ({ids_fmt}) ORDER BY id',
+                user_ids,
+            )
+            session_ids = [row['id'] for row in cursor.fetchall()]
+            cursor.executemany(
+                '''
+                INSERT IGNORE INTO quiz_attempts
+                    (session_id, user_id, quiz_id, selected_option, is_correct)
+                VALUES (%s, %s, %s, %s, %s)
+                ''',
+                [
+                    (session_id, user_id, quiz_id, selected, int(selected == key))
+                    for session_id, (user_id, _, _, answers) in zip(session_ids, planned)
+                    for quiz_id, selected, key in answers
+                ],
+            )
+            cursor.connection.commit()
+
+        rebuild_progress_summary(cursor)
+        rebuild_quiz_stats(cursor)
+        cursor.connection.commit()
+    return emails
+
+
+def _cleanup():
+    from db import db_cursor
+    from routes.progress import rebuild_quiz_stats
+
+    with db_cursor() as cursor:
+        while True:
+            cursor.execute(
+                'DELETE FROM users WHERE email LIKE %s LIMIT %s', (f'%@{BENCH_DOMAIN}', INSERT_CHUNK)
+            )
+            cursor.connection.commit()
+            if cursor.rowcount < INSERT_CHUNK:
+                break
+        # attempts cascade away with the users, but the quiz_stats rollup
+        # still counts them (and every benchmark submit)
+        rebuild_quiz_stats(cursor)
+        cursor.connection.commit()
+
+
+# ---------------------------------------------------------------------------
+# transports
+# ---------------------------------------------------------------------------
+
+class _InProcess:
+    """Flask test client: the full request path minus the network."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None):
+        resp = self.client.open(path, method=method, json=body)
+        return resp.status_code, resp.get_json(silent=True)
+
+
+class _Http:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(
+            self.base_url + path, data=data, method=method,
+            headers={'Content-Type': 'application/json'} if data else {},
+        )
+        try:
+            with self.opener.open(req, timeout=60) as resp:
+                return resp.status, json.loads(resp.read() or b'null')
+        except urllib.error.HTTPError as e:
+            return e.code, None
+
+
+# ---------------------------------------------------------------------------
+# the flow
+# ---------------------------------------------------------------------------
+
+class _Recorder:
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def call(self, transport, name, method, path, body=None):
+        started = time.perf_counter()
+        status, payload = transport.request(method, path, body)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.samples.setdefault(name, []).append(elapsed)
+            if status >= 400:
+                self.errors[name] = self.errors.get(name, 0) + 1
+        return status, payload
+
+
+def _learner(transport, recorder, email, rounds, rng):
+    recorder.call(transport, 'POST /register', 'POST', '/api/register', {
+        'Name': 'Bench Newcomer',
+        'Email Id': f'new{uuid.uuid4().hex}@{BENCH_DOMAIN}',
+        'Password': BENCH_PASSWORD,
+    })
+    status, _ = recorder.call(transport, 'POST /login', 'POST', '/api/login', {
+        'Email Id': email, 'Password': BENCH_PASSWORD,
+    })
+    if status != 200:
+        return
+    recorder.call(transport, 'GET /lessons', 'GET', '/api/lessons?limit=50')
+    for _ in range(rounds):
+        status, started = recorder.call(
+            transport, 'POST /quiz/session/start', 'POST', '/api/quiz/session/start',
+            {'level': rng.choice(['easy', 'intermediate', 'hard']), 'question_count': QUESTIONS_PER_SESSION},
+        )
+        if status != 201:
+            continue
+        answers = [{'quiz_id': q['id'], 'selected_option': rng.choice(OPTIONS)} for q in started['questions']]
+        recorder.call(
+            transport, 'POST /quiz/session/<id>/submit', 'POST',
+            f"/api/quiz/session/{started['session_id']}/submit", {'answers': answers},
+        )
+    recorder.call(transport, 'GET /progress/me/history', 'GET', '/api/progress/me/history?limit=20')
+
+
+def _percentile(sorted_values, q):
+    return sorted_values[min(int(q * len(sorted_values)), len(sorted_values) - 1)]
+
+
+def _summarise(recorder, wall):
+    endpoints = {}
+    for name, samples in recorder.samples.items():
+        ordered = sorted(samples)
+        endpoints[name] = {
+            'requests': len(ordered),
+            'errors': recorder.errors.get(name, 0),
+            'throughput_rps': round(len(ordered) / wall, 2),
+            'p50_ms': round(_percentile(ordered, 0.50) * 1000, 2),
+            'p95_ms': round(_percentile(ordered, 0.95) * 1000, 2),
+            'p99_ms': round(_percentile(ordered, 0.99) * 1000, 2),
+        }
+    return endpoints
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _print_table(endpoints):
+    print(f"{'endpoint':<32} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, r in endpoints.items():
+        print(
+            f"{name:<32} {r['requests']:>8} {r['errors']:>6} {r['throughput_rps']:>8.1f}"
+            f" {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}"
+        )
+
+
+def _compare(current, baseline_path):
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)['endpoints']
+    print(f'\nchange vs. {baseline_path} (negative latency / positive req/s is better)')
+    print(f"{'endpoint':<32} {'req/s':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+    pct = lambda new, old: f'{(new - old) / old * 100:+8.1f}%' if old else '      n/a'
+    for name, r in current.items():
+        old = baseline.get(name)
+        if not old:
+            continue
+        print(
+            f"{name:<32} {pct(r['throughput_rps'], old['throughput_rps'])}"
+            f" {pct(r['p50_ms'], old['p50_ms'])} {pct(r['p95_ms'], old['p95_ms'])}"
+            f" {pct(r['p99_ms'], old['p99_ms'])}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=1000, help='synthetic learners to seed')
+    parser.add_argument('--sessions', type=int, default=20, help='completed sessions per synthetic learner')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--learners', type=int, default=200, help='learner flows to run')
+    parser.add_argument('--rounds', type=int, default=3, help='sessions played per flow')
+    parser.add_argument('--url', help='drive a running server instead of the in-process app')
+    parser.add_argument('--random-seed', type=int, default=42)
+    parser.add_argument('--out', help='results file (default bench/results/learner_flow-<stamp>.json)')
+    parser.add_argument('--compare', help='earlier results file to diff against')
+    parser.add_argument('--keep', action='store_true', help='leave the synthetic rows in place')
+    args = parser.parse_args()
+
+    rng = random.Random(args.random_seed)
+    started = time.perf_counter()
+    emails = _seed_population(args.users, args.sessions, rng)
+    print(f'seeded {args.users} learners x {args.sessions} sessions in {time.perf_counter() - started:.1f} s')
+
+    if args.url:
+        make_transport = lambda: _Http(args.url)
+    else:
+        from app import create_app
+        app = create_app({
+            'SCHEMA_CHECK_ON_STARTUP': False,
+            'SECRET_KEY': os.environ.get('SECRET_KEY') or 'bench-learner-flow',
+        })
+        make_transport = lambda: _InProcess(app)
+
+    recorder = _Recorder()
+    seeds = [rng.randrange(2 ** 32) for _ in range(args.learners)]
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            futures = [
+                pool.submit(_learner, make_transport(), recorder, rng.choice(emails), args.rounds, random.Random(seed))
+                for seed in seeds
+            ]
+            for future in futures:
+                future.result()
+        wall = time.perf_counter() - started
+    finally:
+        if not args.keep:
+            _cleanup()
+
+    endpoints = _summarise(recorder, wall)
+    _print_table(endpoints)
+
+    result = {
+        'benchmark': 'learner_flow',
+        'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'git_revision': _git_revision(),
+        'python': platform.python_version(),
+        'transport': args.url or 'in-process',
+        'config': {k: v for k, v in vars(args).items() if k not in ('out', 'compare')},
+        'wall_seconds': round(wall, 2),
+        'endpoints': endpoints,
+    }
+    out = args.out or os.path.join('bench', 'results', f"learner_flow-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(out) or '.', exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+    print(f'\nresults written to {out}')
+
+    if args.compare:
+        _compare(endpoints, args.compare)
+
+
+if __name__ == '__main__':
+    load_dotenv()
+    sys.exit(main())
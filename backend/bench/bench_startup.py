@@ -0,0 +1,64 @@
+"""
+Worker startup cost
+===================
+Compares the database work a worker used to do on import (create every
+table and upsert the full seed) with what it does now (one schema-version
+query), and times a cold ``import app`` in a fresh interpreter.
+
+Run from the backend directory against a migrated database:
+
+    $ python -m bench.bench_startup --repeat 20
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+from dotenv import load_dotenv
+
+import migrations
+from db import db_cursor
+
+
+def _time(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def _legacy_init():
+    # what every worker ran at import before: all DDL plus a forced re-seed
+    migrations.upgrade(echo=lambda *_: None)
+    for _, _, module in migrations.discover():
+        with db_cursor() as cursor:
+            module.upgrade(cursor)
+    migrations.seed(force=True)
+
+
+def _import_app():
+    subprocess.run([sys.executable, '-c', 'import app'], check=True, capture_output=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    results = [
+        ('legacy init (DDL + full seed)', _time(_legacy_init, args.repeat)),
+        ('schema version check', _time(migrations.check_schema_version, args.repeat)),
+        ('cold `import app` (subprocess)', _time(_import_app, args.repeat)),
+    ]
+    print(f"{'step':<34} {'p50 ms':>10} {'max ms':>10}")
+    for name, timings in results:
+        print(f'{name:<34} {statistics.median(timings):>10.2f} {max(timings):>10.2f}')
+
+
+if __name__ == '__main__':
+    load_dotenv()
+    main()
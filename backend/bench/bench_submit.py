@@ -0,0 +1,88 @@
+"""
+Submit latency vs. answer count
+===============================
+Replays the write path of ``submit_session`` against the configured MySQL
+database and compares one INSERT per answer ("before") with the single
+multi-row insert used now ("after"). Every run happens inside a transaction
+that is rolled back, so the database is left untouched.
+
+Run from the backend directory (needs a seeded database, see Readme):
+
+    $ python -m bench.bench_submit --repeat 200 --counts 1,5,10,20
+"""
+
+import argparse
+import statistics
+import time
+
+from dotenv import load_dotenv
+
+from db import db_cursor
+from routes.progress import INSERT_ATTEMPTS_SQL
+
+FINALISE_SQL = '''
+    UPDATE quiz_sessions
+    SET correct_answers=%s, score_percent=%s, status='completed', completed_at=CURRENT_TIMESTAMP
+    WHERE id=%s
+'''
+
+
+def _setup(cursor, count):
+    cursor.execute(
+        "INSERT INTO users (name, email, password) VALUES ('bench', CONCAT('bench', UUID_SHORT(), '@bench.local'), 'x')"
+    )
+    user_id = cursor.lastrowid
+    cursor.execute(
+        "INSERT INTO quiz_sessions (user_id, level, total_questions) VALUES (%s, 'easy', %s)",
+        (user_id, count),
+    )
+    session_id = cursor.lastrowid
+    cursor.execute('SELECT id FROM quiz ORDER BY id LIMIT %s', (count,))
+    quiz_ids = [r['id'] for r in cursor.fetchall()]
+    rows = [(session_id, user_id, qid, 'A', 1) for qid in quiz_ids]
+    return session_id, rows
+
+
+def _row_by_row(cursor, session_id, rows):
+    for row in rows:
+        cursor.execute(INSERT_ATTEMPTS_SQL, row)
+    cursor.execute(FINALISE_SQL, (len(rows), 100, session_id))
+
+
+def _batched(cursor, session_id, rows):
+    cursor.executemany(INSERT_ATTEMPTS_SQL, rows)
+    cursor.execute(FINALISE_SQL, (len(rows), 100, session_id))
+
+
+def _measure(strategy, count, repeat):
+    timings = []
+    with db_cursor() as cursor:
+        for _ in range(repeat):
+            session_id, rows = _setup(cursor, count)
+            started = time.perf_counter()
+            strategy(cursor, session_id, rows)
+            timings.append((time.perf_counter() - started) * 1000)
+            cursor.connection.rollback()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--counts', default='1,5,10,20')
+    parser.add_argument('--repeat', type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"{'answers':>8} {'before p50 ms':>14} {'after p50 ms':>13} {'before p95 ms':>14} {'after p95 ms':>13}")
+    for count in [int(c) for c in args.counts.split(',')]:
+        before = _measure(_row_by_row, count, args.repeat)
+        after = _measure(_batched, count, args.repeat)
+        p95 = lambda xs: statistics.quantiles(xs, n=20)[-1]
+        print(
+            f'{count:>8} {statistics.median(before):>14.3f} {statistics.median(after):>13.3f}'
+            f' {p95(before):>14.3f} {p95(after):>13.3f}'
+        )
+
+
+if __name__ == '__main__':
+    load_dotenv()
+    main()
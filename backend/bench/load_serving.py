@@ -0,0 +1,174 @@
+"""
+Sync vs. ASGI serving under many concurrent connections
+=======================================================
+Starts the app in each serving mode and drives it with ``--connections``
+concurrent keep-alive HTTP/1.1 clients (plain asyncio, no extra client
+library) for ``--duration`` seconds:
+
+* ``sync`` – the threaded Werkzeug server (what ``app.run()`` uses), one
+  thread per open connection
+* ``asgi`` – ``uvicorn asgi:app`` (needs ``pip install uvicorn a2wsgi``)
+
+Reports connections that could be opened, reconnects forced by servers
+that close after each response, requests/s, latency percentiles and
+errors per mode. ``--url`` drives an already running
+server (e.g. gunicorn) instead of starting one.
+
+Run from the backend directory against a seeded database:
+
+    $ python -m bench.load_serving --connections 2000 --duration 20
+"""
+
+import argparse
+import asyncio
+import resource
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+SERVERS = {
+    # HTTP/1.1 so the threaded server keeps connections alive as well
+    'sync': lambda port: [
+        sys.executable, '-c',
+        'from werkzeug.serving import WSGIRequestHandler; '
+        'WSGIRequestHandler.protocol_version = "HTTP/1.1"; '
+        'from app import create_app; '
+        f'create_app().run(host="127.0.0.1", port={port}, threaded=True)',
+    ],
+    'asgi': lambda port: [
+        sys.executable, '-m', 'uvicorn', 'asgi:app',
+        '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning',
+    ],
+}
+
+
+async def _read_response(reader):
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = int(head.split(b' ', 2)[1])
+    length = 0
+    keep_alive = True
+    for line in head.split(b'\r\n'):
+        name, _, value = line.partition(b':')
+        name = name.strip().lower()
+        if name == b'content-length':
+            length = int(value)
+        elif name == b'connection' and value.strip().lower() == b'close':
+            keep_alive = False
+    await reader.readexactly(length)
+    return status, keep_alive
+
+
+async def _connect(host, port, stats):
+    try:
+        return await asyncio.wait_for(asyncio.open_connection(host, port), 10)
+    except (OSError, asyncio.TimeoutError):
+        stats['connect_errors'] += 1
+        return None, None
+
+
+async def _client(host, port, request, deadline, stats):
+    reader, writer = await _connect(host, port, stats)
+    if writer is None:
+        return
+    stats['connected'] += 1
+    try:
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            writer.write(request)
+            status, keep_alive = await asyncio.wait_for(_read_response(reader), 30)
+            if not keep_alive:
+                # the server closes after every response: reconnect, and
+                # charge the new handshake to the next request
+                writer.close()
+                stats['reconnects'] += 1
+                reader, writer = await _connect(host, port, stats)
+                if writer is None:
+                    return
+            stats['latencies'].append(time.perf_counter() - started)
+            if status >= 500:
+                stats['server_errors'] += 1
+    except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError):
+        stats['dropped'] += 1
+    finally:
+        # None after a failed reconnect
+        if writer is not None:
+            writer.close()
+
+
+async def _drive(url, connections, duration):
+    parts = urlsplit(url)
+    path = parts.path + (f'?{parts.query}' if parts.query else '')
+    request = f'GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\nConnection: keep-alive\r\n\r\n'.encode()
+    stats = {
+        'connected': 0, 'connect_errors': 0, 'reconnects': 0, 'dropped': 0,
+        'server_errors': 0, 'latencies': [],
+    }
+    deadline = time.monotonic() + duration
+    await asyncio.gather(*(
+        _client(parts.hostname, parts.port or 80, request, deadline, stats)
+        for _ in range(connections)
+    ))
+    return stats
+
+
+def _wait_for_port(port, timeout=20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), 0.5).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'server did not start on port {port}')
+
+
+def _report(mode, stats, duration):
+    lat = sorted(stats['latencies'])
+    pct = lambda q: lat[min(int(q * len(lat)), len(lat) - 1)] * 1000 if lat else float('nan')
+    print(
+        f"{mode:>6} {stats['connected']:>9} {stats['connect_errors']:>8} {stats['reconnects']:>10}"
+        f" {stats['dropped']:>7}"
+        f" {len(lat) / duration:>9.0f} {pct(0.5):>8.1f} {pct(0.95):>8.1f} {pct(0.99):>8.1f}"
+        f" {stats['server_errors']:>7}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--modes', default='sync,asgi')
+    parser.add_argument('--url', help='drive this running server instead of starting one')
+    parser.add_argument('--path', default='/api/lessons?limit=20')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--connections', type=int, default=1000)
+    parser.add_argument('--duration', type=float, default=15.0)
+    args = parser.parse_args()
+
+    # every client connection is a file descriptor here too
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    print(f"{'mode':>6} {'connected':>9} {'refused':>8} {'reconnects':>10} {'dropped':>7} {'req/s':>9}"
+          f" {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'5xx':>7}")
+    if args.url:
+        stats = asyncio.run(_drive(args.url, args.connections, args.duration))
+        _report('url', stats, args.duration)
+        return
+
+    for mode in args.modes.split(','):
+        server = subprocess.Popen(
+            SERVERS[mode](args.port), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            _wait_for_port(args.port)
+            url = f'http://127.0.0.1:{args.port}{args.path}'
+            stats = asyncio.run(_drive(url, args.connections, args.duration))
+            _report(mode, stats, args.duration)
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""
+Concurrent submit check
+=======================
+Starts ``--threads`` x ``--submits`` quiz sessions for one throw-away
+user, cycling levels and the practice / review modes. It then submits
+them all in parallel through the Flask test client, so each submit takes
+the real ``submit_session`` path: user and session row locks, attempts
+insert, ``quiz_stats`` and ``user_quiz_review`` upserts, and the
+progress upserts.
+
+Afterwards it checks that:
+
+* no submit failed (a lock deadlock surfaces as a 500)
+* ``user_level_progress`` and ``user_progress_summary`` counters are exact
+  and the best scores are the maxima submitted
+* ``user_quiz_review`` has one row per distinct question answered
+
+The user (and, by cascade, its sessions, attempts and progress) is deleted
+afterwards, and ``quiz_stats`` is rebuilt without its attempts.
+
+Run from the backend directory against a migrated, seeded database:
+
+    $ python -m bench.stress_progress_upsert --threads 16 --submits 10
+"""
+
+import argparse
+import random
+import sys
+import threading
+
+from dotenv import load_dotenv
+
+from db import db_cursor, get_pool
+
+LEVELS = ('easy', 'intermediate', 'hard')
+MODES = ('practice', 'review')
+
+
+def _client(app, user_id):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+    return client
+
+
+def _start_sessions(client, count, questions):
+    started = []
+    for i in range(count):
+        body = {
+            'level': LEVELS[i % len(LEVELS)],
+            'mode': MODES[(i // len(LEVELS)) % len(MODES)],
+            'question_count': questions,
+        }
+        resp = client.post('/api/quiz/session/start', json=body)
+        if resp.status_code == 404 and body['mode'] == 'review':
+            # a small bank runs out of due / unseen questions quickly
+            resp = client.post('/api/quiz/session/start', json={**body, 'mode': 'practice'})
+        if resp.status_code != 201:
+            raise RuntimeError(f'session start failed: {resp.status_code} {resp.get_json()}')
+        started.append(resp.get_json())
+    return started
+
+
+def _submit_many(app, user_id, sessions, barrier, results, errors):
+    client = _client(app, user_id)
+    barrier.wait()
+    for sess in sessions:
+        answers = [
+            {'quiz_id': q['id'], 'selected_option': random.choice('ABCD')}
+            for q in sess['questions']
+        ]
+        resp = client.post(f"/api/quiz/session/{sess['session_id']}/submit", json={'answers': answers})
+        body = resp.get_json()
+        if resp.status_code != 200:
+            errors.append(f"session {sess['session_id']}: {resp.status_code} {body}")
+        else:
+            results.append(body)
+
+
+def _check(user_id, results, answered):
+    failures = []
+    with db_cursor() as cursor:
+        cursor.execute('SELECT * FROM user_level_progress WHERE user_id=%s', (user_id,))
+        by_level = {row['level']: row for row in cursor.fetchall()}
+        cursor.execute('SELECT * FROM user_progress_summary WHERE user_id=%s', (user_id,))
+        summary = cursor.fetchone() or {}
+        cursor.execute('SELECT COUNT(*) AS n FROM user_quiz_review WHERE user_id=%s', (user_id,))
+        reviews = cursor.fetchone()['n']
+
+    def compare(label, row, expected):
+        for key, value in expected.items():
+            got = row.get(key) if row else None
+            if got is None or float(got) != float(value):
+                failures.append(f'{label} {key}: expected {value}, got {got}')
+
+    for level in LEVELS:
+        played = [r for r in results if r['level'] == level]
+        if not played:
+            continue
+        compare(level, by_level.get(level), {
+            'total_sessions': len(played),
+            'total_questions_answered': sum(r['total_questions'] for r in played),
+            'total_correct': sum(r['correct_answers'] for r in played),
+            'best_score_percent': max(r['score_percent'] for r in played),
+        })
+    compare('summary', summary, {
+        'total_sessions': len(results),
+        'total_questions': sum(r['total_questions'] for r in results),
+        'total_correct': sum(r['correct_answers'] for r in results),
+        'best_score_percent': max(r['score_percent'] for r in results),
+    })
+    if reviews != len(answered):
+        failures.append(f'user_quiz_review rows: expected {len(answered)}, got {reviews}')
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--submits', type=int, default=10, help='sessions submitted per thread')
+    parser.add_argument('--questions', type=int, default=5, help='questions per session')
+    args = parser.parse_args()
+    get_pool().max_size = max(get_pool().max_size, args.threads)
+
+    from app import create_app
+    from routes.progress import rebuild_quiz_stats
+    app = create_app({'SECRET_KEY': 'stress', 'SCHEMA_CHECK_ON_STARTUP': False})
+
+    with db_cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO users (name, email, password) VALUES ('stress', CONCAT('stress', UUID_SHORT(), '@bench.local'), 'x')"
+        )
+        user_id = cursor.lastrowid
+        cursor.connection.commit()
+
+    try:
+        sessions = _start_sessions(_client(app, user_id), args.threads * args.submits, args.questions)
+        answered = {q['id'] for sess in sessions for q in sess['questions']}
+
+        results, errors = [], []
+        barrier = threading.Barrier(args.threads)
+        workers = [
+            threading.Thread(
+                target=_submit_many,
+                args=(app, user_id, sessions[i::args.threads], barrier, results, errors),
+            )
+            for i in range(args.threads)
+        ]
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+
+        failures = errors + (_check(user_id, results, answered) if results else ['no submit succeeded'])
+    finally:
+        with db_cursor() as cursor:
+            cursor.execute('DELETE FROM users WHERE id=%s', (user_id,))
+            cursor.connection.commit()
+            rebuild_quiz_stats(cursor)
+            cursor.connection.commit()
+
+    if failures:
+        print('FAIL\n  ' + '\n  '.join(failures))
+        sys.exit(1)
+    print(f'OK: {len(results)} concurrent submits for one user, counters exact')
+
+
+if __name__ == '__main__':
+    load_dotenv()
+    main()
@@ -0,0 +1,124 @@
+"""
+Response compression
+====================
+JSON (and other text) responses larger than ``COMPRESS_MIN_BYTES``
+(default 1024) are compressed with brotli when the client accepts ``br``
+and the optional ``brotli`` package is installed, and with gzip otherwise.
+Streamed responses (exports) and anything already encoded pass through.
+
+Responses with a strong ETag are compressed once per (ETag, encoding):
+the compressed body is kept in a small LRU, so a catalog page requested by
+every learner is only compressed once per catalog change. The
+compressed body gets its own ETag (``"<tag>-gzip"`` / ``"<tag>-br"``).
+"""
+
+import gzip
+import os
+import threading
+from collections import OrderedDict
+
+from flask import request
+
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', 1024))
+COMPRESSIBLE_TYPES = ('application/json', 'text/', 'application/x-ndjson')
+ENCODING_SUFFIXES = ('-gzip', '-br')
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+_brotli = None
+_brotli_checked = False
+
+
+def _brotli_module():
+    # optional dependency, imported on first compressible response
+    global _brotli, _brotli_checked
+    if not _brotli_checked:
+        try:
+            import brotli
+            _brotli = brotli
+        except ImportError:
+            _brotli = None
+        _brotli_checked = True
+    return _brotli
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return _brotli_module().compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def choose_encoding(accept_encoding):
+    if _brotli_module() is not None and accept_encoding['br']:
+        return 'br'
+    if accept_encoding['gzip']:
+        return 'gzip'
+    return None
+
+
+class CompressedBodyCache:
+    """LRU of compressed bodies keyed by (etag, encoding)."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key, body):
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+compressed_bodies = CompressedBodyCache(max_entries=int(os.getenv('COMPRESS_CACHE_ENTRIES', 256)))
+
+
+def _compressible(response):
+    return (
+        response.status_code == 200
+        and not response.direct_passthrough
+        and not response.is_streamed
+        and 'Content-Encoding' not in response.headers
+        and (response.mimetype or '').startswith(COMPRESSIBLE_TYPES)
+    )
+
+
+def compress_response(response):
+    if not _compressible(response):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        key = (etag, encoding)
+        compressed = compressed_bodies.get(key)
+        if compressed is None:
+            compressed = compress(body, encoding)
+            compressed_bodies.put(key, compressed)
+        response.set_etag(f'{etag}-{encoding}')
+    else:
+        compressed = compress(body, encoding)
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_compression(app):
+    app.after_request(compress_response)
@@ -1,8 +1,21 @@
-import pymysql
+import hashlib
+import json
 import os
-from quiz.seed_data import LESSON_SEED_DATA, QUIZ_SEED_DATA, SOURCE_URL
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# pymysql and the seed literals are imported on first use, keeping app
+# import and blueprint registration free of them
+
+DB_NAME = 'Bhasabridge'
+
+# pymysql.constants.SERVER_STATUS.SERVER_STATUS_IN_TRANS
+SERVER_STATUS_IN_TRANS = 1
 
 def connect_db():
+	import pymysql
 	return pymysql.connect(
 		host=os.getenv('DB_HOST'),
 		user=os.getenv('DB_USER'),
@@ -11,191 +24,369 @@ def connect_db():
 	)
 
 
+# ---------------------------------------------------------------------------
+# connection pool
+# ---------------------------------------------------------------------------
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection frees up within the wait timeout."""
+
+
+class ConnectionPool:
+    """
+    Thread-safe, bounded pool of PyMySQL connections bound to the Bhasabridge
+    schema. Idle connections are pinged before reuse once they have sat for
+    longer than ``ping_after`` seconds, and recycled once older than
+    ``max_lifetime`` seconds.
+    """
+
+    def __init__(self, max_size=10, max_lifetime=1800, wait_timeout=5.0, ping_after=30):
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.wait_timeout = wait_timeout
+        self.ping_after = ping_after
+
+        self._pid = os.getpid()
+        self._lock = threading.Condition()
+        self._idle = deque()          # (conn, created_at, last_used_at)
+        self._size = 0                # open connections, idle + in use
+        self._in_use = 0
+        self._created_at = {}         # id(conn) -> creation time
+
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+        self._timeouts = 0
+
+    def _connect(self):
+        import pymysql
+        return pymysql.connect(
+            host=os.getenv('DB_HOST'),
+            user=os.getenv('DB_USER'),
+            password=os.getenv('DB_PASSWORD'),
+            database=DB_NAME,
+            charset='utf8mb4',
+            cursorclass=pymysql.cursors.DictCursor,
+        )
+
+    def _discard(self, conn):
+        self._created_at.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _healthy(self, conn, created_at, last_used_at, now):
+        if now - created_at > self.max_lifetime:
+            return False
+        if now - last_used_at > self.ping_after:
+            try:
+                conn.ping(reconnect=False)
+            except Exception:
+                return False
+        return True
+
+    def _after_fork(self):
+        # connections opened before a fork (e.g. gunicorn --preload) share
+        # their socket with the parent: forget them without sending QUIT
+        self._pid = os.getpid()
+        self._idle.clear()
+        self._created_at.clear()
+        self._size = self._in_use = 0
+
+    def acquire(self):
+        started = time.monotonic()
+        waited = False
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._after_fork()
+        while True:
+            entry = None
+            with self._lock:
+                while True:
+                    if self._idle:
+                        entry = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        # reserve the slot, then connect without holding the lock
+                        self._size += 1
+                        break
+                    remaining = self.wait_timeout - (time.monotonic() - started)
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(
+                            f'no database connection available after {self.wait_timeout}s'
+                        )
+                    waited = True
+                    self._lock.wait(remaining)
+                self._in_use += 1
+
+            if entry is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    self._forget_slot()
+                    raise
+                self._created_at[id(conn)] = time.monotonic()
+                break
+
+            conn, created_at, last_used_at = entry
+            if self._healthy(conn, created_at, last_used_at, time.monotonic()):
+                break
+            self._discard(conn)
+            self._forget_slot()
+
+        with self._lock:
+            self._record_checkout(started, waited)
+        return conn
+
+    def _forget_slot(self):
+        with self._lock:
+            self._size -= 1
+            self._in_use -= 1
+            self._lock.notify()
+
+    def _record_checkout(self, started, waited):
+        self._checkouts += 1
+        if waited:
+            elapsed = time.monotonic() - started
+            self._waits += 1
+            self._wait_time_total += elapsed
+            self._wait_time_max = max(self._wait_time_max, elapsed)
+
+    def release(self, conn, broken=False):
+        # never hand out a connection with a transaction (and its snapshot) still open
+        if not broken and conn.open and conn.server_status & SERVER_STATUS_IN_TRANS:
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+
+        now = time.monotonic()
+        created_at = self._created_at.get(id(conn), now)
+        with self._lock:
+            self._in_use -= 1
+            if broken or not conn.open or now - created_at > self.max_lifetime:
+                self._size -= 1
+                self._discard(conn)
+            else:
+                self._idle.append((conn, created_at, now))
+            self._lock.notify()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_size': self.max_size,
+                'size': self._size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'timeouts': self._timeouts,
+                'wait_time_total_ms': round(self._wait_time_total * 1000, 2),
+                'wait_time_max_ms': round(self._wait_time_max * 1000, 2),
+            }
+
+    def close(self):
+        with self._lock:
+            while self._idle:
+                conn, _, _ = self._idle.pop()
+                self._size -= 1
+                self._discard(conn)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide pool, building it from env settings on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    max_size=int(os.getenv('DB_POOL_SIZE', 10)),
+                    max_lifetime=int(os.getenv('DB_POOL_MAX_LIFETIME', 1800)),
+                    wait_timeout=float(os.getenv('DB_POOL_TIMEOUT', 5)),
+                    ping_after=int(os.getenv('DB_POOL_PING_AFTER', 30)),
+                )
+    return _pool
+
+
+def pool_stats():
+    return get_pool().stats()
+
+
+_cursor_classes = {}
+
+
+def _instrumented_cursor(unbuffered):
+    """
+    DictCursor / SSDictCursor subclass that reports every statement to
+    ``instrumentation.record_query``. executemany() goes through execute()
+    once per round trip, so batched inserts count as the statements sent.
+    """
+    cls = _cursor_classes.get(unbuffered)
+    if cls is None:
+        import pymysql
+        from instrumentation import record_query
+        base = pymysql.cursors.SSDictCursor if unbuffered else pymysql.cursors.DictCursor
+
+        class InstrumentedCursor(base):
+            def execute(self, query, args=None):
+                started = time.perf_counter()
+                try:
+                    return super().execute(query, args)
+                finally:
+                    # unbuffered results report an unknown (unsigned -1) row count
+                    rows = self.rowcount if 0 <= self.rowcount < 2 ** 63 else 0
+                    record_query(query, time.perf_counter() - started, rows)
+
+        cls = _cursor_classes[unbuffered] = InstrumentedCursor
+    return cls
+
+
+@contextmanager
+def db_cursor(unbuffered=False):
+    """
+    Check a connection out of the pool and yield a DictCursor on the
+    Bhasabridge schema, timed by ``instrumentation``. Use ``cursor.connection`` to commit or roll back;
+    anything left uncommitted is rolled back when the block exits.
+
+    With ``unbuffered=True`` the cursor is an SSDictCursor: rows stream from
+    the server as they are fetched instead of being loaded all at once. If
+    the block exits early the connection is dropped rather than drained.
+    """
+    import pymysql
+    pool = get_pool()
+    conn = pool.acquire()
+    cursor = None
+    broken = False
+    try:
+        cursor = conn.cursor(_instrumented_cursor(unbuffered))
+        yield cursor
+    except pymysql.err.OperationalError:
+        broken = True
+        raise
+    except BaseException:
+        # an unread streamed result would have to be read to the end first
+        broken = unbuffered
+        raise
+    finally:
+        if cursor is not None and not (unbuffered and broken):
+            cursor.close()
+        pool.release(conn, broken=broken)
+
+
+SEED_CHUNK_SIZE = 500
+
+LESSON_UPSERT_SQL = """
+    INSERT INTO lesson (level, item_type, english_text, newari_text, romanized_text, source_url)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        romanized_text = VALUES(romanized_text),
+        source_url = VALUES(source_url),
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+QUIZ_UPSERT_SQL = """
+    INSERT INTO quiz (
+        level, lesson_id, question_text,
+        option_a, option_b, option_c, option_d,
+        correct_option, explanation, source_url
+    )
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        lesson_id = VALUES(lesson_id),
+        option_a = VALUES(option_a),
+        option_b = VALUES(option_b),
+        option_c = VALUES(option_c),
+        option_d = VALUES(option_d),
+        correct_option = VALUES(correct_option),
+        explanation = VALUES(explanation),
+        source_url = VALUES(source_url),
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+
+def _upsert_chunked(cursor, sql, rows):
+    # pymysql turns each executemany() call into one multi-row statement
+    for start in range(0, len(rows), SEED_CHUNK_SIZE):
+        cursor.executemany(sql, rows[start:start + SEED_CHUNK_SIZE])
+
+
 def _seed_lessons(cursor):
-    for item in LESSON_SEED_DATA:
-        cursor.execute(
-            """
-            INSERT INTO lesson (level, item_type, english_text, newari_text, romanized_text, source_url)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-                romanized_text = VALUES(romanized_text),
-                source_url = VALUES(source_url),
-                updated_at = CURRENT_TIMESTAMP
-            """,
-            (
-                item['level'],
-                item['item_type'],
-                item['english_text'],
-                item['newari_text'],
-                item.get('romanized_text'),
-                SOURCE_URL,
-            ),
+    from quiz.seed_data import LESSON_SEED_DATA, SOURCE_URL
+    rows = [
+        (
+            item['level'],
+            item['item_type'],
+            item['english_text'],
+            item['newari_text'],
+            item.get('romanized_text'),
+            SOURCE_URL,
         )
+        for item in LESSON_SEED_DATA
+    ]
+    _upsert_chunked(cursor, LESSON_UPSERT_SQL, rows)
 
 
 def _seed_quizzes(cursor):
-    for quiz in QUIZ_SEED_DATA:
-        cursor.execute(
-            """
-            SELECT id FROM lesson
-            WHERE level=%s
-            ORDER BY id ASC
-            LIMIT 1
-            """,
-            (quiz['level'],),
-        )
-        lesson_row = cursor.fetchone()
-        lesson_id = lesson_row['id'] if lesson_row else None
-
-        cursor.execute(
-            """
-            INSERT INTO quiz (
-                level, lesson_id, question_text,
-                option_a, option_b, option_c, option_d,
-                correct_option, explanation, source_url
-            )
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-                lesson_id = VALUES(lesson_id),
-                option_a = VALUES(option_a),
-                option_b = VALUES(option_b),
-                option_c = VALUES(option_c),
-                option_d = VALUES(option_d),
-                correct_option = VALUES(correct_option),
-                explanation = VALUES(explanation),
-                source_url = VALUES(source_url),
-                updated_at = CURRENT_TIMESTAMP
-            """,
-            (
-                quiz['level'],
-                lesson_id,
-                quiz['question_text'],
-                quiz['option_a'],
-                quiz['option_b'],
-                quiz['option_c'],
-                quiz['option_d'],
-                quiz['correct_option'],
-                quiz.get('explanation'),
-                SOURCE_URL,
-            ),
+    from quiz.seed_data import QUIZ_SEED_DATA, SOURCE_URL
+    # each quiz links to the first lesson of its level: resolve once per level
+    cursor.execute('SELECT level, MIN(id) AS lesson_id FROM lesson GROUP BY level')
+    first_lesson = {row['level']: row['lesson_id'] for row in cursor.fetchall()}
+
+    rows = [
+        (
+            quiz['level'],
+            first_lesson.get(quiz['level']),
+            quiz['question_text'],
+            quiz['option_a'],
+            quiz['option_b'],
+            quiz['option_c'],
+            quiz['option_d'],
+            quiz['correct_option'],
+            quiz.get('explanation'),
+            SOURCE_URL,
         )
+        for quiz in QUIZ_SEED_DATA
+    ]
+    _upsert_chunked(cursor, QUIZ_UPSERT_SQL, rows)
 
-def init_db():
-    conn = connect_db()
-    cursor = conn.cursor(pymysql.cursors.DictCursor)
-    cursor.execute("CREATE DATABASE IF NOT EXISTS Bhasabridge")
-    cursor.execute("USE Bhasabridge")
-
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS users (
-        id INT AUTO_INCREMENT PRIMARY KEY,
-        name VARCHAR(100) NOT NULL,
-        email VARCHAR(100) NOT NULL UNIQUE,
-        password VARCHAR(255) NOT NULL,
-        role ENUM('learner','admin') DEFAULT 'learner',
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    """)
-    
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS lesson (
-        id INT AUTO_INCREMENT PRIMARY KEY,
-        level ENUM('easy', 'intermediate', 'hard') NOT NULL,
-        item_type ENUM('word', 'sentence') NOT NULL,
-        english_text VARCHAR(500) NOT NULL,
-        newari_text VARCHAR(500) NOT NULL,
-        english_hash CHAR(64) GENERATED ALWAYS AS (SHA2(english_text, 256)) STORED,
-        newari_hash CHAR(64) GENERATED ALWAYS AS (SHA2(newari_text, 256)) STORED,
-        romanized_text VARCHAR(500) NULL,
-        source_url VARCHAR(500) NOT NULL DEFAULT 'https://www.easynepalityping.com/useful-newari-phrases',
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-        UNIQUE KEY uq_lesson_unique (level, item_type, english_hash, newari_hash),
-        INDEX idx_lesson_level_type (level, item_type)
-    )
-    """)
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS quiz (
-        id INT AUTO_INCREMENT PRIMARY KEY,
-        level ENUM('easy', 'intermediate', 'hard') NOT NULL,
-        lesson_id INT NULL,
-        question_text VARCHAR(500) NOT NULL,
-        question_hash CHAR(64) GENERATED ALWAYS AS (SHA2(question_text, 256)) STORED,
-        option_a VARCHAR(300) NOT NULL,
-        option_b VARCHAR(300) NOT NULL,
-        option_c VARCHAR(300) NOT NULL,
-        option_d VARCHAR(300) NOT NULL,
-        correct_option ENUM('A', 'B', 'C', 'D') NOT NULL,
-        explanation VARCHAR(600) NULL,
-        source_url VARCHAR(500) NOT NULL DEFAULT 'https://www.easynepalityping.com/useful-newari-phrases',
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-        CONSTRAINT fk_quiz_lesson FOREIGN KEY (lesson_id) REFERENCES lesson(id) ON DELETE SET NULL,
-        UNIQUE KEY uq_quiz_level_question (level, question_hash),
-        INDEX idx_quiz_level (level),
-        INDEX idx_quiz_lesson (lesson_id)
-    )
-    """)
-    
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS quiz_sessions (
-        id INT AUTO_INCREMENT PRIMARY KEY,
-        user_id INT NOT NULL,
-        level ENUM('easy', 'intermediate', 'hard') NOT NULL,
-        total_questions INT NOT NULL DEFAULT 0,
-        correct_answers INT NOT NULL DEFAULT 0,
-        score_percent DECIMAL(5,2) DEFAULT 0.00,
-        status ENUM('in_progress', 'completed', 'abandoned') DEFAULT 'in_progress',
-        started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        completed_at TIMESTAMP NULL,
-        CONSTRAINT fk_session_user FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
-        INDEX idx_session_user (user_id),
-        INDEX idx_session_level (level),
-        INDEX idx_session_status (status)
-    )
-    """)
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS quiz_attempts (
-        id INT AUTO_INCREMENT PRIMARY KEY,
-        session_id INT NOT NULL,
-        user_id INT NOT NULL,
-        quiz_id INT NOT NULL,
-        selected_option ENUM('A', 'B', 'C', 'D') NOT NULL,
-        is_correct TINYINT(1) NOT NULL DEFAULT 0,
-        answered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        CONSTRAINT fk_attempt_session FOREIGN KEY (session_id) REFERENCES quiz_sessions(id) ON DELETE CASCADE,
-        CONSTRAINT fk_attempt_user  FOREIGN KEY (user_id)    REFERENCES users(id)         ON DELETE CASCADE,
-        CONSTRAINT fk_attempt_quiz  FOREIGN KEY (quiz_id)    REFERENCES quiz(id)          ON DELETE CASCADE,
-        UNIQUE KEY uq_session_quiz (session_id, quiz_id),
-        INDEX idx_attempt_user    (user_id),
-        INDEX idx_attempt_session (session_id)
-    )
-    """)
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS user_level_progress (
-        id INT AUTO_INCREMENT PRIMARY KEY,
-        user_id INT NOT NULL,
-        level ENUM('easy', 'intermediate', 'hard') NOT NULL,
-        total_sessions INT NOT NULL DEFAULT 0,
-        total_questions_answered INT NOT NULL DEFAULT 0,
-        total_correct INT NOT NULL DEFAULT 0,
-        best_score_percent DECIMAL(5,2) DEFAULT 0.00,
-        last_played_at TIMESTAMP NULL,
-        CONSTRAINT fk_progress_user FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
-        UNIQUE KEY uq_user_level (user_id, level),
-        INDEX idx_progress_user (user_id)
-    )
-    """)
 
-    _seed_lessons(cursor)
-    _seed_quizzes(cursor)
-    conn.commit()
-    cursor.close()
-    conn.close()
+def seed_content_hash():
+    """Fingerprint of the seed literals; unchanged seeds are not re-applied."""
+    from quiz.seed_data import LESSON_SEED_DATA, QUIZ_SEED_DATA, SOURCE_URL
+    payload = json.dumps(
+        [SOURCE_URL, LESSON_SEED_DATA, QUIZ_SEED_DATA],
+        sort_keys=True, ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
 
 
+def seed_catalog(cursor, force=False):
+    """Upsert the seed catalog unless the same content was already applied.
 
+    Returns True when the seed was (re)applied.
+    """
+    content_hash = seed_content_hash()
+    if not force:
+        cursor.execute("SELECT content_hash FROM seed_metadata WHERE name='catalog'")
+        row = cursor.fetchone()
+        if row and row['content_hash'] == content_hash:
+            return False
 
+    _seed_lessons(cursor)
+    _seed_quizzes(cursor)
+    cursor.execute(
+        """
+        INSERT INTO seed_metadata (name, content_hash) VALUES ('catalog', %s)
+        ON DUPLICATE KEY UPDATE content_hash = VALUES(content_hash), applied_at = CURRENT_TIMESTAMP
+        """,
+        (content_hash,),
+    )
+    return True
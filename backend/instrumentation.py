@@ -0,0 +1,240 @@
+"""
+Per-request SQL instrumentation
+===============================
+Every statement run through ``db.db_cursor()`` is timed by the cursor
+class in ``db.py``, which calls ``record_query``. From those samples:
+
+* each request gets a ``Server-Timing`` header:
+  ``db;dur=<total ms>;desc="<n> queries, <rows> rows", db-slowest;dur=<ms>``
+* statements slower than ``SLOW_QUERY_MS`` (default 100) are logged to the
+  ``bhasabridge.slow_query`` logger, a ``SLOW_QUERY_SAMPLE`` share of them
+  (default 1.0), with a normalised SQL fingerprint instead of the text, so
+  no user data ends up in the log
+* process-wide histograms and counters are rendered in Prometheus text
+  format by ``render_prometheus()`` (served at ``/api/admin/metrics``)
+"""
+
+import contextvars
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from functools import lru_cache
+
+from flask import g, request
+
+slow_log = logging.getLogger('bhasabridge.slow_query')
+
+SLOW_QUERY_SECONDS = float(os.getenv('SLOW_QUERY_MS', 100)) / 1000
+SLOW_QUERY_SAMPLE = float(os.getenv('SLOW_QUERY_SAMPLE', 1.0))
+
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+REQUEST_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+# ---------------------------------------------------------------------------
+# fingerprints
+# ---------------------------------------------------------------------------
+
+_COMMENT_RE = re.compile(r'/\*.*?\*/|--[^\n]*', re.S)
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_RE = re.compile(r'%s|%\(\w+\)s')
+_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_ROWS_RE = re.compile(r'(\(\?\+\))(?:\s*,\s*\(\?\+\))+')
+_SPACE_RE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(sql):
+    """SQL with literals, placeholders and value lists collapsed to ``?``."""
+    sql = _COMMENT_RE.sub(' ', sql)
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _PLACEHOLDER_RE.sub('?', sql)
+    sql = _LIST_RE.sub('(?+)', sql)
+    sql = _ROWS_RE.sub(r'\1', sql)
+    return _SPACE_RE.sub(' ', sql).strip().lower()
+
+
+# ---------------------------------------------------------------------------
+# metrics
+# ---------------------------------------------------------------------------
+
+def _labels(names, values, **extra):
+    pairs = [(n, v) for n, v in zip(names, values)] + list(extra.items())
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{n}="{str(v).replace(chr(34), chr(39))}"' for n, v in pairs) + '}'
+
+
+class Histogram:
+    def __init__(self, name, help, buckets, labelnames=()):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.labelnames = labelnames
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0, 0.0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            series[1] += 1
+            series[2] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for labels, (counts, count, total) in sorted(self._series.items()):
+                for bound, n in zip(self.buckets, counts):
+                    lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, le=bound)} {n}')
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, le="+Inf")} {count}')
+                lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {total:.6f}')
+                lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {count}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_labels(self.labelnames, labels)} {value}')
+        return lines
+
+
+query_seconds = Histogram(
+    'bhasabridge_db_query_seconds', 'Duration of single SQL statements.', QUERY_BUCKETS,
+)
+query_total = Counter(
+    'bhasabridge_db_queries_total', 'SQL statements by fingerprint.', ('fingerprint',),
+)
+request_db_seconds = Histogram(
+    'bhasabridge_request_db_seconds', 'Total SQL time per HTTP request.', REQUEST_BUCKETS, ('endpoint',),
+)
+request_queries = Histogram(
+    'bhasabridge_request_queries', 'SQL statements per HTTP request.',
+    (0, 1, 2, 3, 5, 8, 13, 21, 34), ('endpoint',),
+)
+slow_queries_total = Counter(
+    'bhasabridge_slow_queries_total', 'Statements slower than the slow-query threshold.',
+    ('fingerprint',),
+)
+
+
+# ---------------------------------------------------------------------------
+# per-request stats
+# ---------------------------------------------------------------------------
+
+class RequestQueryStats:
+    __slots__ = ('count', 'seconds', 'rows', 'slowest_seconds', 'slowest_fingerprint')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.slowest_seconds = 0.0
+        self.slowest_fingerprint = None
+
+
+_current = contextvars.ContextVar('request_query_stats', default=None)
+
+
+def record_query(sql, elapsed, rows):
+    """Called by the instrumented cursor after every statement."""
+    if isinstance(sql, bytes):
+        sql = sql.decode('utf-8', 'replace')
+    fp = fingerprint(sql)
+    query_seconds.observe(elapsed)
+    query_total.inc(fp)
+
+    stats = _current.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+        stats.rows += rows
+        if elapsed > stats.slowest_seconds:
+            stats.slowest_seconds = elapsed
+            stats.slowest_fingerprint = fp
+
+    if elapsed >= SLOW_QUERY_SECONDS:
+        slow_queries_total.inc(fp)
+        if random.random() < SLOW_QUERY_SAMPLE:
+            slow_log.warning(json.dumps({
+                'at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'ms': round(elapsed * 1000, 2),
+                'rows': rows,
+                'fingerprint': fp,
+                'endpoint': _endpoint(),
+            }))
+
+
+def _endpoint():
+    try:
+        return request.endpoint
+    except RuntimeError:
+        # outside a request (CLI commands, benchmarks)
+        return None
+
+
+def server_timing(stats):
+    return (
+        f'db;dur={stats.seconds * 1000:.2f};desc="{stats.count} queries, {stats.rows} rows", '
+        f'db-slowest;dur={stats.slowest_seconds * 1000:.2f}'
+    )
+
+
+def init_instrumentation(app):
+    @app.before_request
+    def _start_query_stats():
+        g._query_stats_token = _current.set(RequestQueryStats())
+
+    @app.after_request
+    def _report_query_stats(response):
+        stats = _current.get()
+        if stats is not None:
+            response.headers.add('Server-Timing', server_timing(stats))
+            endpoint = request.endpoint or 'unmatched'
+            request_db_seconds.observe(stats.seconds, endpoint)
+            request_queries.observe(stats.count, endpoint)
+        return response
+
+    @app.teardown_request
+    def _clear_query_stats(exc):
+        token = g.pop('_query_stats_token', None)
+        if token is not None:
+            _current.reset(token)
+
+
+def render_prometheus():
+    from db import pool_stats
+
+    lines = []
+    for metric in (query_seconds, query_total, slow_queries_total, request_db_seconds, request_queries):
+        lines.extend(metric.render())
+    for key, value in pool_stats().items():
+        name = f'bhasabridge_db_pool_{key}'
+        lines.append(f'# TYPE {name} gauge')
+        lines.append(f'{name} {value}')
+    return '\n'.join(lines) + '\n'
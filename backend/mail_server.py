@@ -1,15 +1,172 @@
-from flask_mail import Mail,Message
+import atexit
+import json
+import logging
 import os
+import queue
+import threading
+import time
+
+# flask_mail (and smtplib under it) is imported when the first mail is sent
+mail=None
+_mail_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
 
-mail=Mail()
 
 def init_mail(app):
     app.config.update(
-        MAIL_SERVER='smtp.gmail.com',
-        MAIL_PORT=587,
-        MAIL_USE_TLS=True,
+        MAIL_SERVER=os.getenv('MAIL_SERVER', 'smtp.gmail.com'),
+        MAIL_PORT=int(os.getenv('MAIL_PORT', 587)),
+        MAIL_USE_TLS=os.getenv('MAIL_USE_TLS', 'true').lower() == 'true',
         MAIL_USE_SSL=False,
         MAIL_USERNAME=os.getenv('MAIL_USERNAME'),
         MAIL_PASSWORD=os.getenv('MAIL_PASSWORD')
     )
-    mail.init_app(app)
+    dispatcher.init_app(app)
+
+
+def get_mail():
+    """Return the Flask-Mail extension, creating it on first use."""
+    global mail
+    if mail is None:
+        with _mail_lock:
+            if mail is None:
+                from flask_mail import Mail
+                ext = Mail()
+                ext.init_app(dispatcher._app)
+                mail = ext
+    return mail
+
+
+# ---------------------------------------------------------------------------
+# background dispatcher
+# ---------------------------------------------------------------------------
+
+class MailQueueFull(Exception):
+    """Raised when the outbound queue cannot take another message."""
+
+
+class MailDispatcher:
+    """
+    In-process outbound mail queue. Requests enqueue a Message and return at
+    once; worker threads deliver it over an SMTP connection they keep open
+    between messages (closed again after ``idle_timeout`` seconds without
+    work). Failed sends are retried with exponential backoff, and messages
+    that still fail are written to the dead-letter log without their body,
+    which may hold a reset token.
+    """
+
+    def __init__(self, workers=2, max_queue=1000, max_retries=3,
+                 backoff=1.0, idle_timeout=30.0, dead_letter_path='mail_dead_letter.log'):
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.idle_timeout = idle_timeout
+        self.dead_letter_path = dead_letter_path
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._threads = []
+        self._lock = threading.Lock()
+        self._app = None
+
+    def init_app(self, app):
+        self._app = app
+        self.workers = int(os.getenv('MAIL_WORKERS', self.workers))
+        self.max_retries = int(os.getenv('MAIL_MAX_RETRIES', self.max_retries))
+        self.dead_letter_path = os.getenv('MAIL_DEAD_LETTER_PATH', self.dead_letter_path)
+
+    def enqueue(self, msg):
+        self._start()
+        try:
+            self._queue.put_nowait(msg)
+        except queue.Full:
+            raise MailQueueFull('outbound mail queue is full')
+
+    def _start(self):
+        # threads start on first use so importing the app never spawns them
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                t = threading.Thread(target=self._work, name=f'mail-{i}', daemon=True)
+                t.start()
+                self._threads.append(t)
+            atexit.register(self.drain)
+
+    def _work(self):
+        with self._app.app_context():
+            conn = None
+            while True:
+                try:
+                    msg = self._queue.get(timeout=self.idle_timeout)
+                except queue.Empty:
+                    conn = self._close(conn)
+                    continue
+                if msg is None:
+                    self._close(conn)
+                    self._queue.task_done()
+                    return
+                try:
+                    conn = self._deliver(conn, msg)
+                except Exception as e:
+                    # e.g. BadHeaderError: not retryable, but must not kill the
+                    # worker, or nothing queued after it is ever delivered
+                    logger.exception('mail delivery failed')
+                    conn = self._close(conn)
+                    self._dead_letter(msg, e)
+                finally:
+                    self._queue.task_done()
+
+    def _deliver(self, conn, msg):
+        import smtplib
+        for attempt in range(self.max_retries + 1):
+            try:
+                if conn is None:
+                    conn = get_mail().connect()
+                    conn.__enter__()
+                conn.send(msg)
+                return conn
+            except (smtplib.SMTPException, OSError) as e:
+                # the connection may be half-dead; reconnect on the next try
+                conn = self._close(conn)
+                if attempt == self.max_retries:
+                    self._dead_letter(msg, e)
+                    return None
+                time.sleep(self.backoff * (2 ** attempt))
+
+    def _close(self, conn):
+        if conn is not None:
+            try:
+                conn.__exit__(None, None, None)
+            except Exception:
+                pass
+        return None
+
+    def _dead_letter(self, msg, error):
+        entry = {
+            'at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'subject': msg.subject,
+            'recipients': list(msg.recipients),
+            'error': repr(error),
+        }
+        logger.error('mail dead-lettered: %s', entry)
+        try:
+            with open(self.dead_letter_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+        except OSError:
+            logger.exception('could not write mail dead-letter log')
+
+    def drain(self, timeout=10.0):
+        """Stop the workers after they finish what is already queued."""
+        for _ in self._threads:
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                break
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+
+dispatcher = MailDispatcher()
@@ -0,0 +1,153 @@
+"""
+Versioned schema migrations
+===========================
+Each ``mNNN_<name>.py`` module in this package defines ``upgrade(cursor)``;
+NNN is its version. Applied versions are recorded in ``schema_version``.
+
+* ``flask db upgrade`` – create the database if needed and apply pending migrations
+* ``flask db seed``    – load the seed catalog (skipped when unchanged)
+* ``flask db version`` – print the applied and latest versions
+
+App startup only calls ``check_schema_version()``, a single query.
+"""
+
+import importlib
+import pkgutil
+import re
+
+import click
+from flask.cli import AppGroup
+
+import db
+
+_MODULE_RE = re.compile(r'^m(\d{3})_\w+$')
+
+
+def ensure_index(cursor, table, name, columns):
+    """Add an index to a table created before the index was introduced."""
+    cursor.execute(
+        '''
+        SELECT 1 FROM information_schema.statistics
+        WHERE table_schema=DATABASE() AND table_name=%s AND index_name=%s
+        LIMIT 1
+        ''',
+        (table, name),
+    )
+    if not cursor.fetchone():
+        cursor.execute(f'ALTER TABLE {table} ADD INDEX {name} {columns}')
+
+
+def ensure_column(cursor, table, name, definition):
+    """Add a column unless it exists, so a re-run or interrupted migration is safe."""
+    cursor.execute(
+        '''
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema=DATABASE() AND table_name=%s AND column_name=%s
+        LIMIT 1
+        ''',
+        (table, name),
+    )
+    if not cursor.fetchone():
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {name} {definition}')
+
+
+def discover():
+    """Return [(version, name, module)] sorted by version."""
+    found = []
+    for info in pkgutil.iter_modules(__path__):
+        match = _MODULE_RE.match(info.name)
+        if match:
+            module = importlib.import_module(f'{__name__}.{info.name}')
+            found.append((int(match.group(1)), info.name, module))
+    return sorted(found, key=lambda m: m[0])
+
+
+def latest_version():
+    migrations = discover()
+    return migrations[-1][0] if migrations else 0
+
+
+def current_version(cursor):
+    cursor.execute('SELECT COALESCE(MAX(version), 0) AS version FROM schema_version')
+    return cursor.fetchone()['version']
+
+
+def upgrade(echo=print):
+    """Apply pending migrations; returns the list of versions applied."""
+    import pymysql
+    conn = db.connect_db()
+    cursor = conn.cursor(pymysql.cursors.DictCursor)
+    try:
+        cursor.execute(f'CREATE DATABASE IF NOT EXISTS {db.DB_NAME}')
+        cursor.execute(f'USE {db.DB_NAME}')
+        # serialise concurrent upgrades (e.g. several deploy hooks at once)
+        cursor.execute("SELECT GET_LOCK('bhasabridge_migrate', 60) AS got")
+        if not cursor.fetchone()['got']:
+            raise RuntimeError('another migration is running')
+
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INT PRIMARY KEY,
+            name VARCHAR(100) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''')
+        current = current_version(cursor)
+        applied = []
+        for version, name, module in discover():
+            if version <= current:
+                continue
+            echo(f'Applying {name}')
+            module.upgrade(cursor)
+            cursor.execute(
+                'INSERT INTO schema_version (version, name) VALUES (%s, %s)',
+                (version, name),
+            )
+            conn.commit()
+            applied.append(version)
+        return applied
+    finally:
+        cursor.execute("SELECT RELEASE_LOCK('bhasabridge_migrate')")
+        cursor.close()
+        conn.close()
+
+
+def seed(force=False):
+    with db.db_cursor() as cursor:
+        applied = db.seed_catalog(cursor, force=force)
+        cursor.connection.commit()
+    return applied
+
+
+def check_schema_version():
+    """
+    Cheap startup check: returns (current, latest). Raises the driver error
+    if the database is unreachable or has never been migrated.
+    """
+    with db.db_cursor() as cursor:
+        current = current_version(cursor)
+    return current, latest_version()
+
+
+db_cli = AppGroup('db', help='Database schema and seed management.')
+
+
+@db_cli.command('upgrade')
+def upgrade_command():
+    """Create the database if needed and apply pending migrations."""
+    applied = upgrade(echo=click.echo)
+    click.echo(f'Applied {len(applied)} migration(s); schema at version {latest_version()}.')
+
+
+@db_cli.command('seed')
+@click.option('--force', is_flag=True, help='Re-apply even if the seed hash is unchanged.')
+def seed_command(force):
+    """Load the lesson / quiz seed catalog."""
+    click.echo('Seed applied.' if seed(force) else 'Seed unchanged, skipped.')
+
+
+@db_cli.command('version')
+def version_command():
+    """Show applied and latest schema versions."""
+    current, latest = check_schema_version()
+    click.echo(f'schema version {current} (latest {latest})')
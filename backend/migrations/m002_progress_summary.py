@@ -0,0 +1,28 @@
+"""Per-user progress summary maintained by submit_session, backfilled from completed sessions."""
+
+
+def upgrade(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS user_progress_summary (
+        user_id INT PRIMARY KEY,
+        total_sessions INT NOT NULL DEFAULT 0,
+        total_questions INT NOT NULL DEFAULT 0,
+        total_correct INT NOT NULL DEFAULT 0,
+        score_sum DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+        best_score_percent DECIMAL(5,2) NOT NULL DEFAULT 0.00,
+        last_played_at TIMESTAMP NULL,
+        CONSTRAINT fk_summary_user FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+    )
+    """)
+    # same aggregate as rebuild_progress_summary, so existing users do not
+    # start from an empty summary
+    cursor.execute("""
+    INSERT INTO user_progress_summary
+        (user_id, total_sessions, total_questions, total_correct,
+         score_sum, best_score_percent, last_played_at)
+    SELECT user_id, COUNT(*), SUM(total_questions), SUM(correct_answers),
+           SUM(score_percent), MAX(score_percent), MAX(completed_at)
+    FROM quiz_sessions
+    WHERE status='completed'
+    GROUP BY user_id
+    """)
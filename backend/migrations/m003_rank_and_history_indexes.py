@@ -0,0 +1,11 @@
+"""Indexes for leaderboard ranking and keyset session history."""
+
+from migrations import ensure_index
+
+
+def upgrade(cursor):
+    ensure_index(
+        cursor, 'user_level_progress', 'idx_progress_rank',
+        '(level, best_score_percent DESC, total_correct DESC)',
+    )
+    ensure_index(cursor, 'quiz_sessions', 'idx_session_user_started', '(user_id, started_at, id)')
@@ -0,0 +1,11 @@
+"""Content hash of the applied seed catalog."""
+
+
+def upgrade(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS seed_metadata (
+        name VARCHAR(50) PRIMARY KEY,
+        content_hash CHAR(64) NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    )
+    """)
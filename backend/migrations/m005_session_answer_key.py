@@ -0,0 +1,7 @@
+"""Answer key served with each quiz session, graded from at submit."""
+
+from migrations import ensure_column
+
+
+def upgrade(cursor):
+    ensure_column(cursor, 'quiz_sessions', 'answer_key', 'JSON NULL')
@@ -0,0 +1,28 @@
+"""Per-question attempt rollup maintained by submit_session, backfilled from attempts."""
+
+
+def upgrade(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS quiz_stats (
+        quiz_id INT PRIMARY KEY,
+        attempts INT NOT NULL DEFAULT 0,
+        correct INT NOT NULL DEFAULT 0,
+        selected_a INT NOT NULL DEFAULT 0,
+        selected_b INT NOT NULL DEFAULT 0,
+        selected_c INT NOT NULL DEFAULT 0,
+        selected_d INT NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        CONSTRAINT fk_quiz_stats_quiz FOREIGN KEY (quiz_id) REFERENCES quiz(id) ON DELETE CASCADE
+    )
+    """)
+    # same aggregate as rebuild_quiz_stats, so existing questions do not
+    # start from empty counters
+    cursor.execute("""
+    INSERT INTO quiz_stats
+        (quiz_id, attempts, correct, selected_a, selected_b, selected_c, selected_d)
+    SELECT quiz_id, COUNT(*), SUM(is_correct),
+           SUM(selected_option='A'), SUM(selected_option='B'),
+           SUM(selected_option='C'), SUM(selected_option='D')
+    FROM quiz_attempts
+    GROUP BY quiz_id
+    """)
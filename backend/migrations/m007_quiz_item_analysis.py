@@ -0,0 +1,24 @@
+"""Stored per-question item / distractor analysis (flask progress analyze-items)."""
+
+
+def upgrade(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS quiz_item_analysis (
+        quiz_id INT PRIMARY KEY,
+        attempts INT NOT NULL DEFAULT 0,
+        correct INT NOT NULL DEFAULT 0,
+        difficulty_p DECIMAL(6,4) NULL,
+        difficulty_logit DECIMAL(8,4) NULL,
+        point_biserial DECIMAL(6,4) NULL,
+        picks_a INT NOT NULL DEFAULT 0,
+        picks_b INT NOT NULL DEFAULT 0,
+        picks_c INT NOT NULL DEFAULT 0,
+        picks_d INT NOT NULL DEFAULT 0,
+        rest_score_a DECIMAL(6,4) NULL,
+        rest_score_b DECIMAL(6,4) NULL,
+        rest_score_c DECIMAL(6,4) NULL,
+        rest_score_d DECIMAL(6,4) NULL,
+        computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        CONSTRAINT fk_item_analysis_quiz FOREIGN KEY (quiz_id) REFERENCES quiz(id) ON DELETE CASCADE
+    )
+    """)
@@ -0,0 +1,23 @@
+"""Spaced-repetition state per (user, quiz) and the session mode column."""
+
+from migrations import ensure_column
+
+
+def upgrade(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS user_quiz_review (
+        user_id INT NOT NULL,
+        quiz_id INT NOT NULL,
+        ease DECIMAL(4,2) NOT NULL DEFAULT 2.50,
+        interval_days INT NOT NULL DEFAULT 0,
+        repetitions INT NOT NULL DEFAULT 0,
+        lapses INT NOT NULL DEFAULT 0,
+        due_at DATETIME NOT NULL,
+        last_reviewed_at DATETIME NOT NULL,
+        PRIMARY KEY (user_id, quiz_id),
+        INDEX idx_review_due (user_id, due_at),
+        CONSTRAINT fk_review_user FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+        CONSTRAINT fk_review_quiz FOREIGN KEY (quiz_id) REFERENCES quiz(id) ON DELETE CASCADE
+    )
+    """)
+    ensure_column(cursor, 'quiz_sessions', 'mode', "ENUM('practice', 'review') NOT NULL DEFAULT 'practice'")
@@ -0,0 +1,8 @@
+"""Allow the adaptive session mode."""
+
+
+def upgrade(cursor):
+    cursor.execute(
+        "ALTER TABLE quiz_sessions MODIFY COLUMN mode "
+        "ENUM('practice', 'review', 'adaptive') NOT NULL DEFAULT 'practice'"
+    )
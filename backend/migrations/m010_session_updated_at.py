@@ -0,0 +1,13 @@
+"""Row change time on quiz_sessions, for history ETags."""
+
+from migrations import ensure_column, ensure_index
+
+
+def upgrade(cursor):
+    # microsecond precision: a session started and submitted within the same
+    # second must still produce a new history ETag
+    ensure_column(
+        cursor, 'quiz_sessions', 'updated_at',
+        'TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)',
+    )
+    ensure_index(cursor, 'quiz_sessions', 'idx_session_user_updated', '(user_id, updated_at)')
@@ -0,0 +1,18 @@
+"""Profiler rates and collapsed stacks shared by every worker process."""
+
+
+def upgrade(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS profiler_rates (
+        endpoint VARCHAR(200) PRIMARY KEY,
+        percent DECIMAL(6,3) NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS profiler_stacks (
+        stack_hash CHAR(40) PRIMARY KEY,
+        stack TEXT NOT NULL,
+        samples BIGINT NOT NULL DEFAULT 0
+    )
+    """)
@@ -0,0 +1,14 @@
+"""Question level on user_quiz_review, so due questions are read per level from one index."""
+
+from migrations import ensure_column, ensure_index
+
+
+def upgrade(cursor):
+    ensure_column(cursor, 'user_quiz_review', 'level', "ENUM('easy', 'intermediate', 'hard') NOT NULL AFTER quiz_id")
+    cursor.execute("""
+    UPDATE user_quiz_review r
+    JOIN quiz q ON q.id = r.quiz_id
+    SET r.level = q.level
+    WHERE r.level <> q.level
+    """)
+    ensure_index(cursor, 'user_quiz_review', 'idx_review_level_due', '(user_id, level, due_at)')
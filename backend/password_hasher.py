@@ -0,0 +1,87 @@
+"""
+Password hashing service
+========================
+bcrypt calls run on a small dedicated thread pool instead of directly on
+the request thread. The pool is bounded: once ``BCRYPT_WORKERS`` hashes are
+running and ``BCRYPT_MAX_PENDING`` more are queued, new calls fail fast with
+``HasherBusy`` so the endpoint can answer 503 instead of piling up.
+
+The work factor comes from ``BCRYPT_ROUNDS`` (default 12, bcrypt's own
+default). ``needs_rehash`` tells login when a stored hash was made with a
+lower cost so it can be upgraded transparently. bcrypt itself is only
+imported by the first hash or check.
+"""
+
+import os
+import threading
+
+
+class HasherBusy(Exception):
+    """Raised when the hashing pool and its queue are full."""
+
+
+class PasswordHasher:
+    def __init__(self, rounds=12, workers=4, max_pending=16, wait_timeout=0.05):
+        self.rounds = rounds
+        self.wait_timeout = wait_timeout
+        from concurrent.futures import ThreadPoolExecutor
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.wait_timeout):
+            raise HasherBusy('password hashing is saturated')
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def hash(self, password):
+        import bcrypt
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        return self._run(bcrypt.hashpw, password.encode(), salt).decode()
+
+    def check(self, password, hashed):
+        import bcrypt
+        return self._run(bcrypt.checkpw, password.encode(), hashed.encode())
+
+    def needs_rehash(self, hashed):
+        # bcrypt hashes look like $2b$<cost>$<salt+digest>
+        try:
+            return int(hashed.split('$')[2]) < self.rounds
+        except (IndexError, ValueError):
+            return False
+
+
+_hasher = None
+_hasher_lock = threading.Lock()
+
+
+def get_hasher():
+    """Return the process-wide hasher, built from env settings on first use."""
+    global _hasher
+    if _hasher is None:
+        with _hasher_lock:
+            if _hasher is None:
+                _hasher = PasswordHasher(
+                    rounds=int(os.getenv('BCRYPT_ROUNDS', 12)),
+                    workers=int(os.getenv('BCRYPT_WORKERS', 4)),
+                    max_pending=int(os.getenv('BCRYPT_MAX_PENDING', 16)),
+                    wait_timeout=float(os.getenv('BCRYPT_WAIT_TIMEOUT', 0.05)),
+                )
+    return _hasher
+
+
+def hash_password(password):
+    return get_hasher().hash(password)
+
+
+def check_password(password, hashed):
+    return get_hasher().check(password, hashed)
+
+
+def needs_rehash(hashed):
+    return get_hasher().needs_rehash(hashed)
@@ -0,0 +1,265 @@
+"""
+Opt-in sampling profiler for hot routes
+=======================================
+Nothing is profiled until an admin sets a rate for an endpoint at runtime
+(``PUT /api/admin/profiler``). After that, that share of the endpoint's
+requests is registered with a sampler thread. Every
+``PROFILER_INTERVAL_MS`` (default 5) it reads the stacks of the threads
+serving those requests from ``sys._current_frames()``, so profiled requests
+run unmodified: no tracing hook, no per-call overhead.
+
+State is shared through MySQL so the toggle works under several workers:
+
+* rates live in ``profiler_rates``; each worker's profiler thread re-reads
+  them every ``PROFILER_POLL_SECONDS`` (default 5), so a change reaches
+  every worker within that time. Requests only read the in-memory rates.
+* each worker keeps its samples in memory and adds them to
+  ``profiler_stacks`` every ``PROFILER_FLUSH_SECONDS`` (default 5) and
+  when profiling goes idle
+
+Samples aggregate into collapsed stacks (``endpoint;module:func;... N``),
+the input format of flamegraph.pl, speedscope and inferno.
+"""
+
+import hashlib
+import logging
+import os
+import random
+import sys
+import threading
+import time
+
+from flask import g, request
+
+from db import db_cursor
+
+logger = logging.getLogger(__name__)
+
+UPSERT_STACK_SQL = '''
+    INSERT INTO profiler_stacks (stack_hash, stack, samples)
+    VALUES (%s, %s, %s)
+    ON DUPLICATE KEY UPDATE samples = samples + VALUES(samples)
+'''
+
+
+class SamplingProfiler:
+    def __init__(self, interval=0.005, poll_seconds=5, flush_seconds=5, max_stacks=20000, max_depth=128):
+        self.interval = interval
+        self.poll_seconds = poll_seconds
+        self.flush_seconds = flush_seconds
+        self.max_stacks = max_stacks
+        self.max_depth = max_depth
+        self._rates = {}          # endpoint -> share of requests profiled (0..1]
+        self._active = {}         # thread ident -> endpoint being profiled
+        self._pending = {}        # collapsed stack -> samples not yet flushed
+        self._labels = {}         # code object -> 'module:qualname'
+        self._requests = 0
+        self._samples = 0
+        self._next_poll = 0.0
+        self._poll_failed = False
+        self._next_flush = 0.0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    # -- configuration (shared through profiler_rates) ----------------------
+
+    @property
+    def enabled(self):
+        """True when this worker profiles at least one endpoint."""
+        return bool(self._rates)
+
+    def rate(self, endpoint):
+        """Share (0..1) of ``endpoint`` requests this worker profiles."""
+        return self._rates.get(endpoint, 0)
+
+    def poll(self):
+        """Re-read the rates set through any worker (runs on the sampler thread)."""
+        self._next_poll = time.monotonic() + self.poll_seconds
+        try:
+            with db_cursor() as cursor:
+                cursor.execute('SELECT endpoint, percent FROM profiler_rates')
+                rows = cursor.fetchall()
+        except Exception as e:
+            # log once per outage, not every poll (e.g. migration not applied)
+            if not self._poll_failed:
+                logger.warning('could not read profiler rates: %r', e)
+            self._poll_failed = True
+            return
+        self._poll_failed = False
+        # one assignment: request threads read the dict without the lock
+        self._rates = {row['endpoint']: float(row['percent']) / 100 for row in rows}
+
+    def set_rate(self, endpoint, percent):
+        with db_cursor() as cursor:
+            if percent > 0:
+                cursor.execute(
+                    '''
+                    INSERT INTO profiler_rates (endpoint, percent) VALUES (%s, %s)
+                    ON DUPLICATE KEY UPDATE percent = VALUES(percent)
+                    ''',
+                    (endpoint, percent),
+                )
+            else:
+                cursor.execute('DELETE FROM profiler_rates WHERE endpoint=%s', (endpoint,))
+            cursor.connection.commit()
+        self.poll()
+
+    def disable(self):
+        with db_cursor() as cursor:
+            cursor.execute('DELETE FROM profiler_rates')
+            cursor.connection.commit()
+        self._rates = {}
+
+    # -- samples (shared through profiler_stacks) ---------------------------
+
+    def flush(self):
+        """Add this worker's unflushed samples to ``profiler_stacks``."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._next_flush = time.monotonic() + self.flush_seconds
+        if not pending:
+            return
+        rows = sorted(
+            (hashlib.sha1(stack.encode('utf-8')).hexdigest(), stack, count)
+            for stack, count in pending.items()
+        )
+        with db_cursor() as cursor:
+            cursor.executemany(UPSERT_STACK_SQL, rows)
+            cursor.connection.commit()
+
+    def reset(self):
+        with self._lock:
+            self._pending.clear()
+            self._requests = self._samples = 0
+        with db_cursor() as cursor:
+            cursor.execute('DELETE FROM profiler_stacks')
+            cursor.connection.commit()
+
+    def collapsed(self):
+        """Flamegraph input from every worker: one ``stack count`` line per stack."""
+        self.flush()
+        with db_cursor() as cursor:
+            cursor.execute('SELECT stack, samples FROM profiler_stacks ORDER BY stack')
+            rows = cursor.fetchall()
+        return ''.join(f"{row['stack']} {row['samples']}\n" for row in rows)
+
+    def status(self):
+        with db_cursor() as cursor:
+            cursor.execute('SELECT endpoint, percent FROM profiler_rates ORDER BY endpoint')
+            rates = {row['endpoint']: float(row['percent']) for row in cursor.fetchall()}
+            cursor.execute('SELECT COUNT(*) AS stacks, COALESCE(SUM(samples), 0) AS samples FROM profiler_stacks')
+            totals = cursor.fetchone()
+        with self._lock:
+            worker = {
+                'pid': os.getpid(),
+                'profiled_requests': self._requests,
+                'samples': self._samples,
+                'unflushed_stacks': len(self._pending),
+                'active': len(self._active),
+            }
+        return {
+            'rates': rates,
+            'interval_ms': self.interval * 1000,
+            'poll_seconds': self.poll_seconds,
+            'samples': int(totals['samples']),
+            'distinct_stacks': totals['stacks'],
+            'worker': worker,
+        }
+
+    # -- request hooks ------------------------------------------------------
+
+    def begin(self, endpoint):
+        rate = self._rates.get(endpoint)
+        if not rate or random.random() >= rate:
+            return False
+        with self._lock:
+            self._active[threading.get_ident()] = endpoint
+            self._requests += 1
+            self._wake.set()
+        return True
+
+    def end(self):
+        with self._lock:
+            self._active.pop(threading.get_ident(), None)
+
+    # -- sampler ------------------------------------------------------------
+
+    def start(self):
+        """Start the sampler / poller thread; cheap after the first call."""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            if time.monotonic() >= self._next_poll:
+                self.poll()
+            with self._lock:
+                active = dict(self._active)
+                idle = not active
+                flush_due = idle or time.monotonic() >= self._next_flush
+            if flush_due:
+                try:
+                    self.flush()
+                except Exception:
+                    logger.exception('could not flush profiler samples')
+            if idle:
+                with self._lock:
+                    if not self._active:
+                        self._wake.clear()
+                # sleep until a profiled request begins or the next poll is due
+                self._wake.wait(max(self._next_poll - time.monotonic(), 0))
+                continue
+            frames = sys._current_frames()
+            collapsed = [
+                self._collapse(endpoint, frames[ident])
+                for ident, endpoint in active.items() if ident in frames
+            ]
+            del frames
+            with self._lock:
+                for stack in collapsed:
+                    if stack not in self._pending and len(self._pending) >= self.max_stacks:
+                        stack = stack.split(';', 1)[0] + ';(other)'
+                    self._pending[stack] = self._pending.get(stack, 0) + 1
+                    self._samples += 1
+            time.sleep(self.interval)
+
+    def _collapse(self, endpoint, frame):
+        labels = self._labels
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            label = labels.get(code)
+            if label is None:
+                module = frame.f_globals.get('__name__', '?')
+                label = labels[code] = f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+            names.append(label)
+            frame = frame.f_back
+        names.append(endpoint)
+        return ';'.join(reversed(names))
+
+
+profiler = SamplingProfiler(
+    interval=float(os.getenv('PROFILER_INTERVAL_MS', 5)) / 1000,
+    poll_seconds=float(os.getenv('PROFILER_POLL_SECONDS', 5)),
+    flush_seconds=float(os.getenv('PROFILER_FLUSH_SECONDS', 5)),
+)
+
+
+def init_profiling(app):
+    @app.before_request
+    def _maybe_profile():
+        # the thread starts on the first request, so importing the app never
+        # spawns it; rates are polled there, never on the request thread
+        profiler.start()
+        if profiler.enabled and profiler.begin(request.endpoint):
+            g._profiled = True
+
+    @app.teardown_request
+    def _end_profile(exc):
+        if g.pop('_profiled', False):
+            profiler.end()
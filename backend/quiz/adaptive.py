@@ -0,0 +1,219 @@
+"""
+Adaptive question selection
+===========================
+An ``adaptive`` session favours questions the learner is likely to get
+right about ``TARGET_SUCCESS`` of the time: hard enough to teach, easy
+enough to keep going.
+
+The chance that a learner with level accuracy ``a`` answers question ``i``
+is estimated on the logit scale from the learner's accuracy, the
+question's correct rate ``p_i`` (from the ``quiz_stats`` rollup) and the
+level's mean rate::
+
+    logit(P) = logit(a) + logit(p_i) - logit(p_level)
+
+Each question is weighted by how close ``P`` is to the target. Weights
+depend on the learner only through ``a``, so accuracy is cut into
+``ACCURACY_BANDS`` bands and every (level, band) gets a precomputed Vose
+alias table. A draw is one table lookup plus O(1) per question.
+
+Tables are rebuilt when the set of questions changes. Every
+``ADAPTIVE_REFRESH_SECONDS`` (default 60) only the ``quiz_stats`` rows
+updated since the last refresh are read, and only the levels they belong
+to are rebuilt. Session start itself reads one ``user_level_progress`` row.
+"""
+
+import math
+import os
+import random
+import threading
+import time
+
+from quiz.catalog import catalog_cache
+
+TARGET_SUCCESS = 0.7
+WEIGHT_WIDTH = 0.15
+# every question keeps some chance of being drawn
+WEIGHT_FLOOR = 0.05
+ACCURACY_BANDS = 10
+
+_rng = random.SystemRandom()
+
+
+def _logit(p):
+    p = min(max(p, 0.02), 0.98)
+    return math.log(p / (1 - p))
+
+
+def build_alias(weights):
+    """Vose's alias method: O(n) tables for O(1) weighted draws."""
+    n = len(weights)
+    total = float(sum(weights))
+    scaled = [w * n / total for w in weights]
+    prob = [0.0] * n
+    alias = [0] * n
+    small = [i for i, w in enumerate(scaled) if w < 1.0]
+    large = [i for i, w in enumerate(scaled) if w >= 1.0]
+    while small and large:
+        s = small.pop()
+        g = large.pop()
+        prob[s] = scaled[s]
+        alias[s] = g
+        scaled[g] -= 1.0 - scaled[s]
+        (small if scaled[g] < 1.0 else large).append(g)
+    for i in small + large:
+        prob[i] = 1.0
+    return prob, alias
+
+
+class AliasTable:
+    def __init__(self, ids, weights):
+        self.ids = ids
+        self.prob, self.alias = build_alias(weights)
+
+    def draw(self, rng):
+        i = int(rng.random() * len(self.ids))
+        return self.ids[i] if rng.random() < self.prob[i] else self.ids[self.alias[i]]
+
+    def sample(self, count, rng):
+        """``count`` distinct ids, weighted; rejection is cheap while count << len(ids)."""
+        if count >= len(self.ids):
+            picked = list(self.ids)
+            rng.shuffle(picked)
+            return picked
+        picked = []
+        seen = set()
+        for _ in range(count * 20):
+            qid = self.draw(rng)
+            if qid not in seen:
+                seen.add(qid)
+                picked.append(qid)
+                if len(picked) == count:
+                    return picked
+        # weights too concentrated to finish by rejection: fill uniformly
+        rest = [qid for qid in self.ids if qid not in seen]
+        return picked + rng.sample(rest, count - len(picked))
+
+
+def band_of(accuracy):
+    return min(int(accuracy * ACCURACY_BANDS), ACCURACY_BANDS - 1)
+
+
+def item_weights(rates, mean_rate, accuracy):
+    shift = _logit(accuracy) - _logit(mean_rate)
+    weights = []
+    for rate in rates:
+        p = 1 / (1 + math.exp(-(_logit(rate) + shift)))
+        weights.append(WEIGHT_FLOOR + math.exp(-0.5 * ((p - TARGET_SUCCESS) / WEIGHT_WIDTH) ** 2))
+    return weights
+
+
+class AdaptiveWeights:
+    """Per-worker cache of alias tables keyed by (level, accuracy band)."""
+
+    def __init__(self, refresh_seconds=60):
+        self.refresh_seconds = refresh_seconds
+        self._snapshot = None
+        self._quiz_ids = None
+        self._watermark = None
+        self._next_refresh = 0.0
+        self._stats = {}
+        self._tables = {}
+        self._mean_rate = {}
+        self._lock = threading.Lock()
+
+    def _load_stats(self, cursor, since):
+        if since is None:
+            cursor.execute('SELECT quiz_id, attempts, correct, NOW() AS now FROM quiz_stats')
+        else:
+            # >= so same-second writes are not missed; rows hold absolute counts
+            cursor.execute(
+                'SELECT quiz_id, attempts, correct, NOW() AS now FROM quiz_stats WHERE updated_at >= %s',
+                (since,),
+            )
+        rows = cursor.fetchall()
+        if not rows:
+            cursor.execute('SELECT NOW() AS now')
+            return {}, cursor.fetchone()['now']
+        return {row['quiz_id']: (row['attempts'], row['correct']) for row in rows}, rows[0]['now']
+
+    def _rebuild_level(self, snap, level, tables, mean_rates):
+        ids = snap.quiz_ids_by_level.get(level, [])
+        if not ids:
+            for band in range(ACCURACY_BANDS):
+                tables.pop((level, band), None)
+            return
+        # Laplace-smoothed correct rate; unseen questions count as 50 %
+        rates = []
+        for qid in ids:
+            attempts, correct = self._stats.get(qid, (0, 0))
+            rates.append((correct + 1) / (attempts + 2))
+        mean_rate = sum(rates) / len(rates)
+        mean_rates[level] = mean_rate
+        for band in range(ACCURACY_BANDS):
+            accuracy = (band + 0.5) / ACCURACY_BANDS
+            tables[(level, band)] = AliasTable(ids, item_weights(rates, mean_rate, accuracy))
+
+    def refresh(self, cursor, snap):
+        now = time.monotonic()
+        if snap is self._snapshot and now < self._next_refresh:
+            return
+        with self._lock:
+            if snap is self._snapshot and now < self._next_refresh:
+                return
+            # a reloaded snapshot with the same questions keeps the tables
+            if snap.quiz_ids_by_level != self._quiz_ids:
+                self._stats, self._watermark = self._load_stats(cursor, None)
+                levels = set(snap.quiz_ids_by_level)
+                tables, mean_rates = {}, {}
+            else:
+                changed, self._watermark = self._load_stats(cursor, self._watermark)
+                self._stats.update(changed)
+                levels = {
+                    snap.quizzes_by_id[qid]['level'] for qid in changed if qid in snap.quizzes_by_id
+                }
+                tables, mean_rates = dict(self._tables), dict(self._mean_rate)
+            for level in levels:
+                self._rebuild_level(snap, level, tables, mean_rates)
+            # readers skip the lock: publish complete dicts in one assignment each
+            self._tables = tables
+            self._mean_rate = mean_rates
+            self._snapshot = snap
+            self._quiz_ids = snap.quiz_ids_by_level
+            self._next_refresh = now + self.refresh_seconds
+
+    def mean_rate(self, level):
+        return self._mean_rate.get(level, 0.5)
+
+    def table(self, level, accuracy):
+        return self._tables.get((level, band_of(accuracy)))
+
+
+adaptive_weights = AdaptiveWeights(refresh_seconds=int(os.getenv('ADAPTIVE_REFRESH_SECONDS', 60)))
+
+
+def learner_accuracy(cursor, user_id, level):
+    """Smoothed share of the learner's answers at ``level`` that were right, or None."""
+    cursor.execute(
+        'SELECT total_questions_answered, total_correct FROM user_level_progress WHERE user_id=%s AND level=%s',
+        (user_id, level),
+    )
+    row = cursor.fetchone()
+    if not row or not row['total_questions_answered']:
+        return None
+    return (row['total_correct'] + 1) / (row['total_questions_answered'] + 2)
+
+
+def adaptive_questions(cursor, user_id, level, count, fields, seed=None, snapshot=None):
+    """Up to ``count`` questions for ``level`` drawn by the learner's band weights."""
+    snap = snapshot or catalog_cache.snapshot()
+    adaptive_weights.refresh(cursor, snap)
+    accuracy = learner_accuracy(cursor, user_id, level)
+    if accuracy is None:
+        # no history yet: treat the learner as average for the level
+        accuracy = adaptive_weights.mean_rate(level)
+    table = adaptive_weights.table(level, accuracy)
+    if table is None:
+        return []
+    rng = random.Random(seed) if seed is not None else _rng
+    return [{f: snap.quizzes_by_id[qid][f] for f in fields} for qid in table.sample(count, rng)]
@@ -0,0 +1,127 @@
+"""
+Answer keys of in-progress quiz sessions
+========================================
+``start_session`` records which questions it served and their correct
+options; ``submit_session`` grades from that key instead of re-reading the
+``quiz`` table, and answers to questions outside it are rejected.
+
+The key is written to ``quiz_sessions.answer_key`` (JSON) in the same
+insert as the session, which makes it durable and visible to every worker.
+Submit reads the column in the same locking SELECT as the session row.
+Each worker also keeps recent keys in a store (by default an in-memory
+LRU with a TTL), so the submit that usually follows on the same worker
+does not have to decode it.
+
+* ``ANSWER_KEY_CACHE_SIZE`` – keys kept per worker (default 10000, 0 disables)
+* ``ANSWER_KEY_CACHE_TTL``  – seconds a key stays cached (default 3600)
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def encode_key(key):
+    return json.dumps({str(quiz_id): option for quiz_id, option in key.items()})
+
+
+def decode_key(raw):
+    if raw is None:
+        return None
+    return {int(quiz_id): option for quiz_id, option in json.loads(raw).items()}
+
+
+class AnswerKeyStore:
+    """Interface for per-worker answer-key stores."""
+
+    def get(self, session_id):
+        raise NotImplementedError
+
+    def put(self, session_id, key):
+        raise NotImplementedError
+
+    def discard(self, session_id):
+        raise NotImplementedError
+
+
+class NullAnswerKeyStore(AnswerKeyStore):
+    """Caches nothing; every submit reads the key from the database."""
+
+    def get(self, session_id):
+        return None
+
+    def put(self, session_id, key):
+        pass
+
+    def discard(self, session_id):
+        pass
+
+
+class MemoryAnswerKeyStore(AnswerKeyStore):
+    """Bounded LRU of session_id -> key whose entries expire after ``ttl``."""
+
+    def __init__(self, max_entries=10000, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            expires_at, key = entry
+            if expires_at <= time.monotonic():
+                del self._entries[session_id]
+                return None
+            self._entries.move_to_end(session_id)
+            return key
+
+    def put(self, session_id, key):
+        with self._lock:
+            self._entries[session_id] = (time.monotonic() + self.ttl, key)
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, session_id):
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+
+def _default_store():
+    size = int(os.getenv('ANSWER_KEY_CACHE_SIZE', 10000))
+    if size <= 0:
+        return NullAnswerKeyStore()
+    return MemoryAnswerKeyStore(max_entries=size, ttl=int(os.getenv('ANSWER_KEY_CACHE_TTL', 3600)))
+
+
+answer_key_store = _default_store()
+
+
+def set_answer_key_store(store):
+    """Swap the per-worker store (e.g. for a shared one)."""
+    global answer_key_store
+    answer_key_store = store
+
+
+def remember_answer_key(session_id, key):
+    answer_key_store.put(session_id, key)
+
+
+def forget_answer_key(session_id):
+    answer_key_store.discard(session_id)
+
+
+def load_answer_key(session_id, raw):
+    """
+    Return the session's key from the store, falling back to ``raw``, the
+    ``answer_key`` column value the caller read with the session row.
+    """
+    key = answer_key_store.get(session_id)
+    if key is None:
+        key = decode_key(raw)
+    return key
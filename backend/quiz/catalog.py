@@ -0,0 +1,123 @@
+"""
+In-process read-through cache for the lesson / quiz catalog
+============================================================
+The whole catalog is a few hundred rows, so each worker keeps one snapshot
+of both tables in memory and answers list / lookup requests from it.
+
+* Every admin write calls ``catalog_cache.invalidate()``, which bumps the
+  version and drops the snapshot; the next read reloads it from MySQL.
+* Snapshots also expire after ``CATALOG_CACHE_TTL`` seconds (default 60),
+  which bounds staleness for writes made through *another* worker process.
+* Each snapshot carries content tags (hashes of its rows) used for the list
+  endpoints' ETags. They depend only on the data, so every worker computes
+  the same tag for the same catalog.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from db import db_cursor
+
+LEVEL_ORDER = {'easy': 0, 'intermediate': 1, 'hard': 2}
+
+
+def _content_tag(rows):
+    payload = json.dumps(rows, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class CatalogSnapshot:
+    """Immutable view of the catalog at one cache version."""
+
+    def __init__(self, version, expires_at, lessons, quizzes):
+        self.version = version
+        self.expires_at = expires_at
+        self.lessons = lessons
+        self.quizzes = quizzes
+        self.lessons_by_id = {row['id']: row for row in lessons}
+        self.quizzes_by_id = {row['id']: row for row in quizzes}
+        # sort keys matching the list order, for cursor seeks with bisect
+        self.lesson_keys = [(LEVEL_ORDER[row['level']], row['id']) for row in lessons]
+        self.quiz_keys = [(LEVEL_ORDER[row['level']], row['id']) for row in quizzes]
+        self.quiz_ids_by_level = {}
+        for row in quizzes:
+            self.quiz_ids_by_level.setdefault(row['level'], []).append(row['id'])
+        self.lessons_tag = _content_tag(lessons)
+        self.quizzes_tag = _content_tag(quizzes)
+
+
+def _load_catalog(cursor):
+    cursor.execute(
+        '''
+        SELECT id, level, item_type, english_text, newari_text, romanized_text, source_url, created_at, updated_at
+        FROM lesson
+        ORDER BY FIELD(level, 'easy', 'intermediate', 'hard'), id ASC
+        '''
+    )
+    lessons = cursor.fetchall()
+    cursor.execute(
+        '''
+        SELECT q.id, q.level, q.lesson_id, l.english_text AS lesson_english_text,
+               q.question_text, q.option_a, q.option_b, q.option_c, q.option_d,
+               q.correct_option, q.explanation, q.source_url, q.created_at, q.updated_at
+        FROM quiz q
+        LEFT JOIN lesson l ON l.id=q.lesson_id
+        ORDER BY FIELD(q.level, 'easy', 'intermediate', 'hard'), q.id ASC
+        '''
+    )
+    quizzes = cursor.fetchall()
+    return list(lessons), list(quizzes)
+
+
+class CatalogCache:
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._version = 0
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    @property
+    def version(self):
+        return self._version
+
+    def _fresh(self, snap):
+        return (
+            snap is not None
+            and snap.version == self._version
+            and snap.expires_at > time.monotonic()
+        )
+
+    def snapshot(self):
+        """Return the current snapshot, reading through to MySQL if needed."""
+        snap = self._snapshot
+        if self._fresh(snap):
+            return snap
+
+        # only one thread reloads; the rest wait for its result
+        with self._load_lock:
+            snap = self._snapshot
+            if self._fresh(snap):
+                return snap
+
+            version = self._version
+            with db_cursor() as cursor:
+                lessons, quizzes = _load_catalog(cursor)
+            snap = CatalogSnapshot(version, time.monotonic() + self.ttl, lessons, quizzes)
+
+            with self._lock:
+                # an admin write during the load makes this snapshot stale already
+                if version == self._version:
+                    self._snapshot = snap
+            return snap
+
+    def invalidate(self):
+        with self._lock:
+            self._version += 1
+            self._snapshot = None
+
+
+catalog_cache = CatalogCache(ttl=int(os.getenv('CATALOG_CACHE_TTL', 60)))
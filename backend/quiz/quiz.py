@@ -1,20 +1,23 @@
-from flask import Blueprint,jsonify,request,session
-from db import connect_db
-import pymysql
-from routes.login_required import login_required
-import random
+from flask import Blueprint,jsonify,request
+from db import db_cursor
+from quiz.catalog import LEVEL_ORDER, catalog_cache
+from quiz.sampler import sample_questions
+from routes.conditional import etag_for, not_modified, tag_response
+from routes.login_required import admin_required
+from routes.pagination import (
+    MAX_OFFSET, NEXT_CURSOR_HEADER, InvalidCursor, clamp, decode_cursor, encode_cursor,
+)
+import bisect
 
 quiz = Blueprint('quiz',__name__)
 
 VALID_LESSON_LEVELS = ['easy', 'intermediate', 'hard']
 VALID_ITEM_TYPES = ['word', 'sentence']
 VALID_OPTIONS = ['A', 'B', 'C', 'D']
-
-
-def _is_admin(cursor, user_id):
-    cursor.execute('SELECT role FROM users WHERE id=%s', (user_id,))
-    user = cursor.fetchone()
-    return bool(user and user.get('role') == 'admin')
+MAX_PAGE_SIZE = 200
+# clients may keep list pages but must revalidate them (ETag) before reuse
+CATALOG_CACHE_CONTROL = 'public, no-cache'
+QUESTION_FIELDS = ['id', 'level', 'question_text', 'option_a', 'option_b', 'option_c', 'option_d']
 
 
 def _validate_lesson_payload(data):
@@ -42,240 +45,188 @@ def _validate_quiz_payload(data):
         return 'correct_option must be A, B, C, or D'
     return None
 
+def _catalog_page(rows, keys, matches, limit, offset, token):
+    """
+    One page of a catalog list. With a cursor (level, id) the walk starts
+    right after that row via bisect on the snapshot's sort keys, so deep
+    pages cost the same as the first; otherwise the legacy offset applies.
+    """
+    start = 0
+    if token:
+        level, last_id = decode_cursor(token, 2)
+        if level not in LEVEL_ORDER or not isinstance(last_id, int):
+            raise InvalidCursor('invalid cursor')
+        start = bisect.bisect_right(keys, (LEVEL_ORDER[level], last_id))
+        offset = 0
+
+    page = []
+    for i in range(start, len(rows)):
+        row = rows[i]
+        if not matches(row):
+            continue
+        if offset:
+            offset -= 1
+            continue
+        page.append(row)
+        if len(page) > limit:
+            break
+
+    headers = {}
+    if len(page) > limit:
+        page = page[:limit]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(page[-1]['level'], page[-1]['id'])
+    return page, headers
+
+
 @quiz.route('/lessons', methods=['GET'])
 def list_lessons():
-    level = request.args.get('level')
-    item_type = request.args.get('item_type')
-    limit = int(request.args.get('limit', 50))
-    offset = int(request.args.get('offset', 0))
-
-    filters = []
-    params = []
-    if level:
-        filters.append('level=%s')
-        params.append(level)
-    if item_type:
-        filters.append('item_type=%s')
-        params.append(item_type)
-
-    where_clause = f"WHERE {' AND '.join(filters)}" if filters else ''
-
-    conn = connect_db()
+    level = (request.args.get('level') or '').lower()
+    item_type = (request.args.get('item_type') or '').lower()
+    limit = clamp(request.args.get('limit'), 50, MAX_PAGE_SIZE, minimum=1)
+    offset = clamp(request.args.get('offset'), 0, MAX_OFFSET)
+
+    snap = catalog_cache.snapshot()
+    etag = etag_for(snap.lessons_tag)
+    cached = not_modified(etag, CATALOG_CACHE_CONTROL)
+    if cached:
+        return cached
+
+    def matches(row):
+        return (not level or row['level'] == level) and (not item_type or row['item_type'] == item_type)
+
     try:
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
-        cursor.execute('USE Bhasabridge')
-        query = f'''
-            SELECT id, level, item_type, english_text, newari_text, romanized_text, source_url, created_at, updated_at
-            FROM lesson
-            {where_clause}
-            ORDER BY FIELD(level, 'easy', 'intermediate', 'hard'), id ASC
-            LIMIT %s OFFSET %s
-        '''
-        params.extend([limit, offset])
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-        return jsonify(rows), 200
-    finally:
-        cursor.close()
-        conn.close()
+        rows, headers = _catalog_page(
+            snap.lessons, snap.lesson_keys, matches, limit, offset, request.args.get('cursor')
+        )
+    except InvalidCursor:
+        return jsonify({'Status': 'invalid cursor'}), 400
+    return tag_response(jsonify(rows), etag, CATALOG_CACHE_CONTROL), 200, headers
 
 
 @quiz.route('/lessons/<int:lesson_id>', methods=['GET'])
 def get_lesson_by_id(lesson_id):
-    conn = connect_db()
-    try:
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
-        cursor.execute('USE Bhasabridge')
-        cursor.execute(
-            '''
-            SELECT id, level, item_type, english_text, newari_text, romanized_text, source_url, created_at, updated_at
-            FROM lesson
-            WHERE id=%s
-            ''',
-            (lesson_id,),
-        )
-        row = cursor.fetchone()
-        if not row:
-            return jsonify({'Status': 'Lesson not found'}), 404
-        return jsonify(row), 200
-    finally:
-        cursor.close()
-        conn.close()
+    row = catalog_cache.snapshot().lessons_by_id.get(lesson_id)
+    if not row:
+        return jsonify({'Status': 'Lesson not found'}), 404
+    return jsonify(row), 200
 
 
 @quiz.route('/admin/lessons', methods=['POST'])
-@login_required
+@admin_required
 def add_lesson_admin():
     data = request.json or {}
     error = _validate_lesson_payload(data)
     if error:
         return jsonify({'Status': error}), 400
 
-    conn = connect_db()
     try:
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
-        cursor.execute('USE Bhasabridge')
-        if not _is_admin(cursor, session['user_id']):
-            return jsonify({'Status': 'forbidden'}), 403
-
-        cursor.execute(
-            '''
-            INSERT INTO lesson (level, item_type, english_text, newari_text, romanized_text, source_url)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            ''',
-            (
-                data['level'],
-                data['item_type'],
-                data['english_text'].strip(),
-                data['newari_text'].strip(),
-                (data.get('romanized_text') or '').strip() or None,
-                (data.get('source_url') or 'https://www.easynepalityping.com/useful-newari-phrases').strip(),
-            ),
-        )
-        conn.commit()
-        return jsonify({'Status': 'Lesson added', 'id': cursor.lastrowid}), 201
+        with db_cursor() as cursor:
+            cursor.execute(
+                '''
+                INSERT INTO lesson (level, item_type, english_text, newari_text, romanized_text, source_url)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ''',
+                (
+                    data['level'],
+                    data['item_type'],
+                    data['english_text'].strip(),
+                    data['newari_text'].strip(),
+                    (data.get('romanized_text') or '').strip() or None,
+                    (data.get('source_url') or 'https://www.easynepalityping.com/useful-newari-phrases').strip(),
+                ),
+            )
+            cursor.connection.commit()
+            catalog_cache.invalidate()
+            return jsonify({'Status': 'Lesson added', 'id': cursor.lastrowid}), 201
     except Exception as e:
-        conn.rollback()
         return jsonify({'Status': 'Error', 'error': str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @quiz.route('/admin/lessons/<int:lesson_id>', methods=['PUT'])
-@login_required
+@admin_required
 def update_lesson_admin(lesson_id):
     data = request.json or {}
     error = _validate_lesson_payload(data)
     if error:
         return jsonify({'Status': error}), 400
 
-    conn = connect_db()
     try:
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
-        cursor.execute('USE Bhasabridge')
-        if not _is_admin(cursor, session['user_id']):
-            return jsonify({'Status': 'forbidden'}), 403
-
-        cursor.execute(
-            '''
-            UPDATE lesson
-            SET level=%s, item_type=%s, english_text=%s, newari_text=%s, romanized_text=%s, source_url=%s
-            WHERE id=%s
-            ''',
-            (
-                data['level'],
-                data['item_type'],
-                data['english_text'].strip(),
-                data['newari_text'].strip(),
-                (data.get('romanized_text') or '').strip() or None,
-                (data.get('source_url') or 'https://www.easynepalityping.com/useful-newari-phrases').strip(),
-                lesson_id,
-            ),
-        )
-        if cursor.rowcount == 0:
-            conn.rollback()
-            return jsonify({'Status': 'Lesson not found'}), 404
-        conn.commit()
-        return jsonify({'Status': 'Lesson updated'}), 200
+        with db_cursor() as cursor:
+            cursor.execute(
+                '''
+                UPDATE lesson
+                SET level=%s, item_type=%s, english_text=%s, newari_text=%s, romanized_text=%s, source_url=%s
+                WHERE id=%s
+                ''',
+                (
+                    data['level'],
+                    data['item_type'],
+                    data['english_text'].strip(),
+                    data['newari_text'].strip(),
+                    (data.get('romanized_text') or '').strip() or None,
+                    (data.get('source_url') or 'https://www.easynepalityping.com/useful-newari-phrases').strip(),
+                    lesson_id,
+                ),
+            )
+            if cursor.rowcount == 0:
+                cursor.connection.rollback()
+                return jsonify({'Status': 'Lesson not found'}), 404
+            cursor.connection.commit()
+            catalog_cache.invalidate()
+            return jsonify({'Status': 'Lesson updated'}), 200
     except Exception as e:
-        conn.rollback()
         return jsonify({'Status': 'Error', 'error': str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @quiz.route('/admin/lessons/<int:lesson_id>', methods=['DELETE'])
-@login_required
+@admin_required
 def delete_lesson_admin(lesson_id):
-    conn = connect_db()
-    try:
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
-        cursor.execute('USE Bhasabridge')
-        if not _is_admin(cursor, session['user_id']):
-            return jsonify({'Status': 'forbidden'}), 403
-
+    with db_cursor() as cursor:
         cursor.execute('DELETE FROM lesson WHERE id=%s', (lesson_id,))
         if cursor.rowcount == 0:
-            conn.rollback()
+            cursor.connection.rollback()
             return jsonify({'Status': 'Lesson not found'}), 404
-        conn.commit()
+        cursor.connection.commit()
+        catalog_cache.invalidate()
         return jsonify({'Status': 'Lesson deleted'}), 200
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @quiz.route('/quizzes', methods=['GET'])
 def list_quizzes():
-    level = request.args.get('level')
+    level = (request.args.get('level') or '').lower()
     lesson_id = request.args.get('lesson_id')
-    limit = int(request.args.get('limit', 50))
-    offset = int(request.args.get('offset', 0))
+    lesson_id = int(lesson_id) if lesson_id else None
+    limit = clamp(request.args.get('limit'), 50, MAX_PAGE_SIZE, minimum=1)
+    offset = clamp(request.args.get('offset'), 0, MAX_OFFSET)
 
-    filters = []
-    params = []
-    if level:
-        filters.append('q.level=%s')
-        params.append(level)
-    if lesson_id:
-        filters.append('q.lesson_id=%s')
-        params.append(int(lesson_id))
+    snap = catalog_cache.snapshot()
+    etag = etag_for(snap.quizzes_tag)
+    cached = not_modified(etag, CATALOG_CACHE_CONTROL)
+    if cached:
+        return cached
 
-    where_clause = f"WHERE {' AND '.join(filters)}" if filters else ''
+    def matches(row):
+        return (not level or row['level'] == level) and (lesson_id is None or row['lesson_id'] == lesson_id)
 
-    conn = connect_db()
     try:
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
-        cursor.execute('USE Bhasabridge')
-        query = f'''
-            SELECT q.id, q.level, q.lesson_id, l.english_text AS lesson_english_text,
-                   q.question_text, q.option_a, q.option_b, q.option_c, q.option_d,
-                   q.correct_option, q.explanation, q.source_url, q.created_at, q.updated_at
-            FROM quiz q
-            LEFT JOIN lesson l ON l.id=q.lesson_id
-            {where_clause}
-            ORDER BY FIELD(q.level, 'easy', 'intermediate', 'hard'), q.id ASC
-            LIMIT %s OFFSET %s
-        '''
-        params.extend([limit, offset])
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-        return jsonify(rows), 200
-    finally:
-        cursor.close()
-        conn.close()
+        rows, headers = _catalog_page(
+            snap.quizzes, snap.quiz_keys, matches, limit, offset, request.args.get('cursor')
+        )
+    except InvalidCursor:
+        return jsonify({'Status': 'invalid cursor'}), 400
+    return tag_response(jsonify(rows), etag, CATALOG_CACHE_CONTROL), 200, headers
 
 
 @quiz.route('/quizzes/<int:quiz_id>', methods=['GET'])
 def get_quiz_by_id(quiz_id):
-    conn = connect_db()
-    try:
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
-        cursor.execute('USE Bhasabridge')
-        cursor.execute(
-            '''
-            SELECT q.id, q.level, q.lesson_id, l.english_text AS lesson_english_text,
-                   q.question_text, q.option_a, q.option_b, q.option_c, q.option_d,
-                   q.correct_option, q.explanation, q.source_url, q.created_at, q.updated_at
-            FROM quiz q
-            LEFT JOIN lesson l ON l.id=q.lesson_id
-            WHERE q.id=%s
-            ''',
-            (quiz_id,),
-        )
-        row = cursor.fetchone()
-        if not row:
-            return jsonify({'Status': 'Quiz not found'}), 404
-        return jsonify(row), 200
-    finally:
-        cursor.close()
-        conn.close()
+    row = catalog_cache.snapshot().quizzes_by_id.get(quiz_id)
+    if not row:
+        return jsonify({'Status': 'Quiz not found'}), 404
+    return jsonify(row), 200
 
 
 @quiz.route('/admin/quizzes', methods=['POST'])
-@login_required
+@admin_required
 def add_quiz_admin():
     data = request.json or {}
     error = _validate_quiz_payload(data)
@@ -286,46 +237,38 @@ def add_quiz_admin():
     if lesson_id in ('', None):
         lesson_id = None
 
-    conn = connect_db()
     try:
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
-        cursor.execute('USE Bhasabridge')
-        if not _is_admin(cursor, session['user_id']):
-            return jsonify({'Status': 'forbidden'}), 403
-
-        cursor.execute(
-            '''
-            INSERT INTO quiz (
-                level, lesson_id, question_text, option_a, option_b, option_c, option_d,
-                correct_option, explanation, source_url
+        with db_cursor() as cursor:
+            cursor.execute(
+                '''
+                INSERT INTO quiz (
+                    level, lesson_id, question_text, option_a, option_b, option_c, option_d,
+                    correct_option, explanation, source_url
+                )
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                ''',
+                (
+                    data['level'],
+                    lesson_id,
+                    data['question_text'].strip(),
+                    data['option_a'].strip(),
+                    data['option_b'].strip(),
+                    data['option_c'].strip(),
+                    data['option_d'].strip(),
+                    str(data['correct_option']).upper(),
+                    (data.get('explanation') or '').strip() or None,
+                    (data.get('source_url') or 'https://www.easynepalityping.com/useful-newari-phrases').strip(),
+                ),
             )
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ''',
-            (
-                data['level'],
-                lesson_id,
-                data['question_text'].strip(),
-                data['option_a'].strip(),
-                data['option_b'].strip(),
-                data['option_c'].strip(),
-                data['option_d'].strip(),
-                str(data['correct_option']).upper(),
-                (data.get('explanation') or '').strip() or None,
-                (data.get('source_url') or 'https://www.easynepalityping.com/useful-newari-phrases').strip(),
-            ),
-        )
-        conn.commit()
-        return jsonify({'Status': 'Quiz added', 'id': cursor.lastrowid}), 201
+            cursor.connection.commit()
+            catalog_cache.invalidate()
+            return jsonify({'Status': 'Quiz added', 'id': cursor.lastrowid}), 201
     except Exception as e:
-        conn.rollback()
         return jsonify({'Status': 'Error', 'error': str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @quiz.route('/admin/quizzes/<int:quiz_id>', methods=['PUT'])
-@login_required
+@admin_required
 def update_quiz_admin(quiz_id):
     data = request.json or {}
     error = _validate_quiz_payload(data)
@@ -336,67 +279,56 @@ def update_quiz_admin(quiz_id):
     if lesson_id in ('', None):
         lesson_id = None
 
-    conn = connect_db()
     try:
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
-        cursor.execute('USE Bhasabridge')
-        if not _is_admin(cursor, session['user_id']):
-            return jsonify({'Status': 'forbidden'}), 403
-
-        cursor.execute(
-            '''
-            UPDATE quiz
-            SET level=%s, lesson_id=%s, question_text=%s,
-                option_a=%s, option_b=%s, option_c=%s, option_d=%s,
-                correct_option=%s, explanation=%s, source_url=%s
-            WHERE id=%s
-            ''',
-            (
-                data['level'],
-                lesson_id,
-                data['question_text'].strip(),
-                data['option_a'].strip(),
-                data['option_b'].strip(),
-                data['option_c'].strip(),
-                data['option_d'].strip(),
-                str(data['correct_option']).upper(),
-                (data.get('explanation') or '').strip() or None,
-                (data.get('source_url') or 'https://www.easynepalityping.com/useful-newari-phrases').strip(),
-                quiz_id,
-            ),
-        )
-        if cursor.rowcount == 0:
-            conn.rollback()
-            return jsonify({'Status': 'Quiz not found'}), 404
-        conn.commit()
-        return jsonify({'Status': 'Quiz updated'}), 200
+        with db_cursor() as cursor:
+            cursor.execute(
+                '''
+                UPDATE quiz
+                SET level=%s, lesson_id=%s, question_text=%s,
+                    option_a=%s, option_b=%s, option_c=%s, option_d=%s,
+                    correct_option=%s, explanation=%s, source_url=%s
+                WHERE id=%s
+                ''',
+                (
+                    data['level'],
+                    lesson_id,
+                    data['question_text'].strip(),
+                    data['option_a'].strip(),
+                    data['option_b'].strip(),
+                    data['option_c'].strip(),
+                    data['option_d'].strip(),
+                    str(data['correct_option']).upper(),
+                    (data.get('explanation') or '').strip() or None,
+                    (data.get('source_url') or 'https://www.easynepalityping.com/useful-newari-phrases').strip(),
+                    quiz_id,
+                ),
+            )
+            if cursor.rowcount == 0:
+                cursor.connection.rollback()
+                return jsonify({'Status': 'Quiz not found'}), 404
+            # review rows carry the level so due questions are read per level
+            cursor.execute(
+                'UPDATE user_quiz_review SET level=%s WHERE quiz_id=%s AND level<>%s',
+                (data['level'], quiz_id, data['level']),
+            )
+            cursor.connection.commit()
+            catalog_cache.invalidate()
+            return jsonify({'Status': 'Quiz updated'}), 200
     except Exception as e:
-        conn.rollback()
         return jsonify({'Status': 'Error', 'error': str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @quiz.route('/admin/quizzes/<int:quiz_id>', methods=['DELETE'])
-@login_required
+@admin_required
 def delete_quiz_admin(quiz_id):
-    conn = connect_db()
-    try:
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
-        cursor.execute('USE Bhasabridge')
-        if not _is_admin(cursor, session['user_id']):
-            return jsonify({'Status': 'forbidden'}), 403
-
+    with db_cursor() as cursor:
         cursor.execute('DELETE FROM quiz WHERE id=%s', (quiz_id,))
         if cursor.rowcount == 0:
-            conn.rollback()
+            cursor.connection.rollback()
             return jsonify({'Status': 'Quiz not found'}), 404
-        conn.commit()
+        cursor.connection.commit()
+        catalog_cache.invalidate()
         return jsonify({'Status': 'Quiz deleted'}), 200
-    finally:
-        cursor.close()
-        conn.close()
 
 
 # ---------------------------------------------------------------------------
@@ -406,7 +338,8 @@ def delete_quiz_admin(quiz_id):
 def get_random_quiz():
     """
     Return random quiz questions (no session tracking).
-    Query params: level (required), count (default 5, max 20)
+    Query params: level (required), count (default 5, max 20),
+                  seed (optional, makes the draw reproducible)
     Correct answers are hidden – suitable for frontend quiz practice UI.
     """
     level = (request.args.get('level') or '').lower()
@@ -415,26 +348,8 @@ def get_random_quiz():
     if level not in VALID_LESSON_LEVELS:
         return jsonify({'Status': 'level must be easy, intermediate, or hard'}), 400
 
-    conn = connect_db()
-    try:
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
-        cursor.execute('USE Bhasabridge')
-        cursor.execute(
-            '''
-            SELECT id, level, question_text,
-                   option_a, option_b, option_c, option_d
-            FROM quiz
-            WHERE level=%s
-            ORDER BY RAND()
-            LIMIT %s
-            ''',
-            (level, count),
-        )
-        rows = cursor.fetchall()
-        return jsonify({'level': level, 'count': len(rows), 'questions': rows}), 200
-    finally:
-        cursor.close()
-        conn.close()
+    rows = sample_questions(level, count, QUESTION_FIELDS, seed=request.args.get('seed'))
+    return jsonify({'level': level, 'count': len(rows), 'questions': rows}), 200
 
 
 
@@ -0,0 +1,36 @@
+"""
+Question sampling without ``ORDER BY RAND()``
+==============================================
+Each catalog snapshot carries a per-level list of quiz ids. A draw picks
+``count`` distinct ids uniformly at random (the same distribution as
+``ORDER BY RAND() LIMIT n``) and resolves them through the snapshot's
+primary-key index, so cost is O(count) whatever the size of the bank.
+
+Passing a ``seed`` makes a draw reproducible for a given catalog version.
+"""
+
+import random
+
+from quiz.catalog import catalog_cache
+
+_rng = random.SystemRandom()
+
+
+def sample_quiz_ids(level, count, seed=None, snapshot=None, exclude=None):
+    """Return up to ``count`` distinct quiz ids for ``level``, none from ``exclude``."""
+    snap = snapshot or catalog_cache.snapshot()
+    ids = snap.quiz_ids_by_level.get(level, [])
+    if exclude:
+        ids = [i for i in ids if i not in exclude]
+    rng = random.Random(seed) if seed is not None else _rng
+    return rng.sample(ids, min(count, len(ids)))
+
+
+def sample_questions(level, count, fields, seed=None, snapshot=None):
+    """Return up to ``count`` random quiz rows for ``level``, limited to ``fields``."""
+    snap = snapshot or catalog_cache.snapshot()
+    rows = []
+    for quiz_id in sample_quiz_ids(level, count, seed=seed, snapshot=snap):
+        row = snap.quizzes_by_id[quiz_id]
+        rows.append({f: row[f] for f in fields})
+    return rows
@@ -0,0 +1,166 @@
+"""
+Spaced-repetition scheduling (SM-2)
+===================================
+``user_quiz_review`` holds one row per (user, question) the user has
+answered: the question's level, SM-2 ease factor, current interval,
+successful repetitions in a row and the time the question is next due.
+
+* ``submit_session`` calls ``record_reviews`` once per submit. It reads the
+  affected rows by primary key, applies SM-2 in Python and writes them back
+  in one batched upsert.
+* A ``review`` session takes the user's due questions from the
+  ``idx_review_level_due (user_id, level, due_at)`` index, oldest due
+  first, so other levels' due rows are never read. It tops the session up
+  with questions the user has never seen. Unseen ones are found by checking
+  random candidates of the level against the primary key, a few at a time,
+  never by reading the user's whole history.
+
+Answers are only right or wrong, so they map to SM-2 quality 4 ("correct
+after some hesitation") and 1 ("incorrect").
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from quiz.catalog import catalog_cache
+from quiz.sampler import sample_quiz_ids
+
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+QUALITY_CORRECT = 4
+QUALITY_WRONG = 1
+
+# candidates checked per primary-key probe, as a multiple of the shortfall
+UNSEEN_PROBE_FACTOR = 4
+
+UPSERT_REVIEW_SQL = '''
+    INSERT INTO user_quiz_review
+        (user_id, quiz_id, level, ease, interval_days, repetitions, lapses, due_at, last_reviewed_at)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        level            = VALUES(level),
+        ease             = VALUES(ease),
+        interval_days    = VALUES(interval_days),
+        repetitions      = VALUES(repetitions),
+        lapses           = VALUES(lapses),
+        due_at           = VALUES(due_at),
+        last_reviewed_at = VALUES(last_reviewed_at)
+'''
+
+
+def utcnow():
+    # naive UTC, matching how due_at is stored
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def sm2(ease, interval_days, repetitions, quality):
+    """One SM-2 step; returns the new (ease, interval_days, repetitions)."""
+    if quality >= 3:
+        if repetitions == 0:
+            interval_days = 1
+        elif repetitions == 1:
+            interval_days = 6
+        else:
+            interval_days = round(interval_days * ease)
+        repetitions += 1
+    else:
+        repetitions = 0
+        interval_days = 1
+    ease += 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)
+    return max(MIN_EASE, round(ease, 2)), interval_days, repetitions
+
+
+def record_reviews(cursor, user_id, level, graded, now=None):
+    """
+    Advance the schedule of every (quiz_id, is_correct) in ``graded``, all
+    questions of ``level``.
+    Call inside the submit transaction; the rows are locked until commit.
+    The caller must already hold the user's ``users`` row lock: the locking
+    read below takes gap locks on keys that do not exist yet, and two
+    unserialised submits upserting into the same gap deadlock.
+    """
+    if not graded:
+        return
+    now = now or utcnow()
+    quiz_ids = sorted(qid for qid, _ in graded)
+    fmt = ','.join(['%s'] * len(quiz_ids))
+    cursor.execute(
+        f'''
+        SELECT quiz_id, ease, interval_days, repetitions, lapses
+        FROM user_quiz_review
+        WHERE user_id=%s AND quiz_id IN ({fmt})
+        FOR UPDATE
+        ''',
+        [user_id] + quiz_ids,
+    )
+    current = {row['quiz_id']: row for row in cursor.fetchall()}
+
+    rows = []
+    for qid, is_correct in sorted(graded):
+        state = current.get(qid)
+        ease = float(state['ease']) if state else DEFAULT_EASE
+        interval_days = state['interval_days'] if state else 0
+        repetitions = state['repetitions'] if state else 0
+        lapses = state['lapses'] if state else 0
+        quality = QUALITY_CORRECT if is_correct else QUALITY_WRONG
+        ease, interval_days, repetitions = sm2(ease, interval_days, repetitions, quality)
+        if not is_correct and state:
+            lapses += 1
+        rows.append((
+            user_id, qid, level, ease, interval_days, repetitions, lapses,
+            now + timedelta(days=interval_days), now,
+        ))
+    cursor.executemany(UPSERT_REVIEW_SQL, rows)
+
+
+def due_quiz_ids(cursor, user_id, level, limit, now=None):
+    """Up to ``limit`` of the user's due questions for ``level``, most overdue first."""
+    cursor.execute(
+        '''
+        SELECT quiz_id
+        FROM user_quiz_review
+        WHERE user_id=%s AND level=%s AND due_at <= %s
+        ORDER BY due_at
+        LIMIT %s
+        ''',
+        (user_id, level, now or utcnow(), limit),
+    )
+    return [row['quiz_id'] for row in cursor.fetchall()]
+
+
+def unseen_quiz_ids(cursor, user_id, level, count, snap, exclude=()):
+    """
+    Up to ``count`` random ``level`` questions the user has no review row
+    for. Candidates are probed by primary key in small batches, so the cost
+    depends on ``count`` and how much of the level the user has seen, not on
+    the size of their history.
+    """
+    level_size = len(snap.quiz_ids_by_level.get(level, []))
+    candidates = sample_quiz_ids(level, level_size, snapshot=snap, exclude=exclude)
+    batch = max(count * UNSEEN_PROBE_FACTOR, 10)
+    picked = []
+    for start in range(0, len(candidates), batch):
+        probe = candidates[start:start + batch]
+        fmt = ','.join(['%s'] * len(probe))
+        cursor.execute(
+            f'SELECT quiz_id FROM user_quiz_review WHERE user_id=%s AND quiz_id IN ({fmt})',
+            [user_id] + probe,
+        )
+        seen = {row['quiz_id'] for row in cursor.fetchall()}
+        picked += [qid for qid in probe if qid not in seen][:count - len(picked)]
+        if len(picked) >= count:
+            break
+    return picked
+
+
+def review_questions(cursor, user_id, level, count, fields, snapshot=None):
+    """
+    Questions for a review session: due ones first, then ones the user has
+    not answered before. May return fewer than ``count`` when nothing else
+    is due. Pass ``snapshot`` when ``cursor`` holds a pool connection: a
+    snapshot reload checks out another one.
+    """
+    snap = snapshot or catalog_cache.snapshot()
+    quiz_ids = [qid for qid in due_quiz_ids(cursor, user_id, level, count) if qid in snap.quizzes_by_id]
+    if len(quiz_ids) < count:
+        quiz_ids += unseen_quiz_ids(cursor, user_id, level, count - len(quiz_ids), snap, exclude=set(quiz_ids))
+    return [{f: snap.quizzes_by_id[qid][f] for f in fields} for qid in quiz_ids]
@@ -1,41 +1,44 @@
 from flask import Blueprint,request,jsonify,session
-import pymysql
-from db import connect_db
-import bcrypt
+from db import db_cursor
+import password_hasher
+from password_hasher import HasherBusy
 import re
 from token_generater.token_gen import generate_pasword_reset_token
-import jwt
 from flask import current_app
-from flask_mail import Message
-from mail_server import mail
+from mail_server import dispatcher, MailQueueFull
+from routes.login_required import remember_role
 import os
 
 
+# pymysql, jwt and flask_mail are imported inside the views that need them
+# so registering this blueprint stays cheap
 auth = Blueprint('auth',__name__)
 
+
+def _busy():
+	return jsonify({'Status':'Server busy, please retry'}),503,{'Retry-After':'1'}
+
 @auth.route('/register',methods=['POST'])
 def register():
+	import pymysql
 	name_reg = r"[A-Za-z\s\'-]{2,20}$"
 	data = request.json
 	name = data['Name']
 	email = data['Email Id']
 	password = data['Password']
-	hash_password = bcrypt.hashpw(password.encode(),bcrypt.gensalt()).decode()
 	email_reg = r'^[\w]+\@[A-Za-z]{2,10}\.[A-Za-z]+$'	
 	if not re.fullmatch(name_reg,name):
 		return jsonify({'Status':'Invalid Name syntax'}),400
 	if not re.fullmatch(email_reg,email):
 		return jsonify({'Status':'Invalid email syntax'}),400
 	try:
-		conn = connect_db()
-		cursor = conn.cursor(pymysql.cursors.DictCursor)
-		cursor.execute("USE Bhasabridge")
-
-		cursor.execute("INSERT INTO users(name,email,password) VALUES (%s,%s,%s)",(name,email,hash_password))
-
-		conn.commit()
-		cursor.close()
-		conn.close()
+		hash_password = password_hasher.hash_password(password)
+	except HasherBusy:
+		return _busy()
+	try:
+		with db_cursor() as cursor:
+			cursor.execute("INSERT INTO users(name,email,password) VALUES (%s,%s,%s)",(name,email,hash_password))
+			cursor.connection.commit()
 		return jsonify({'Status':'Registered'}),201
 	except pymysql.err.IntegrityError as e:
 		if e.args[0] == 1062:  # Duplicate entry
@@ -56,21 +59,30 @@ def login():
 	if not re.fullmatch(email_reg,email):
 		return jsonify({'Status':'Invalid email syntax'}),400
 	try:
-		conn = connect_db()
-		cursor = conn.cursor(pymysql.cursors.DictCursor)
-		cursor.execute("USE Bhasabridge")
-
-		cursor.execute("SELECT id,password,name FROM users WHERE email=%s",(email,))
-		user = cursor.fetchone()
-		cursor.close()
-		conn.close()
-
-		if user and bcrypt.checkpw(password.encode(),user['password'].encode()):
+		with db_cursor() as cursor:
+			cursor.execute("SELECT id,password,name,role FROM users WHERE email=%s",(email,))
+			user = cursor.fetchone()
+
+		if user and password_hasher.check_password(password,user['password']):
+			if password_hasher.needs_rehash(user['password']):
+				# stored hash predates the current work factor: upgrade it,
+				# or leave it for the next login when the hasher is saturated
+				try:
+					new_hash = password_hasher.hash_password(password)
+				except HasherBusy:
+					new_hash = None
+				if new_hash:
+					with db_cursor() as cursor:
+						cursor.execute("UPDATE users SET password=%s WHERE id=%s",(new_hash,user['id']))
+						cursor.connection.commit()
 			session['user_id'] = user['id']
 			session['user_name'] = user['name']
+			remember_role(user['role'])
 			return jsonify({'Status':'Login Sucess','Username':user['name']}),200
 		else:
 			return jsonify({'Status':'Invalid Credentials'}),401
+	except HasherBusy:
+		return _busy()
 	except Exception as e:
 		return jsonify({'Status':'Error'}),500
 	
@@ -82,20 +94,15 @@ def request_reset():
 	if not re.fullmatch(email_reg,email):
 		return jsonify({'Status':'Invalid Email Syntax'}),400
 	try:
-		conn = connect_db()
-		cursor = conn.cursor(pymysql.cursors.DictCursor)
-		cursor.execute("USE Bhasabridge")
-
-		cursor.execute("SELECT id FROM users WHERE email=%s",(email,))
-		user = cursor.fetchone()
+		with db_cursor() as cursor:
+			cursor.execute("SELECT id FROM users WHERE email=%s",(email,))
+			user = cursor.fetchone()
 		if not user:
-			
 			return jsonify({'Status':'No user with this email'}),404
-		cursor.close()
-		conn.close()
 		user_id = user['id']
 		token  = generate_pasword_reset_token(user_id)
 		
+		from flask_mail import Message
 		msg = Message(
 			subject="Password Reset Request",
 				sender=os.getenv('MAIL_USERNAME'),
@@ -111,15 +118,19 @@ Your token to reset password is:
 
 If you did not request a password reset, please ignore this email.
 """
-		mail.send(msg)
+		# delivered by the background dispatcher; no SMTP wait on this request
+		dispatcher.enqueue(msg)
 
 		return jsonify({'Status':'Reset password email sent'}),200
+	except MailQueueFull:
+		return _busy()
 	except Exception as e:
 		return jsonify({'Status':'Reset Link Generstion Failed','error':str(e)}),500
 	
 
 @auth.route('/reset_password',methods=['POST'])
 def reset_pasword():
+	import jwt
 	data = request.json
 	token = data['Token']
 	new_password = data['New Password']
@@ -133,16 +144,14 @@ def reset_pasword():
 	except jwt.InvalidTokenError:
 		return jsonify({'Status':'Invalid Token'}),400
 	user_id = payload['user_id']
-	hash_password = bcrypt.hashpw(new_password.encode(),bcrypt.gensalt()).decode()
 	try:
-		conn = connect_db()
-		cursor = conn.cursor(pymysql.cursors.DictCursor)
-		cursor.execute("USE Bhasabridge")
-
-		cursor.execute("UPDATE users SET password=%s WHERE id=%s",(hash_password, user_id))
-		conn.commit()
-		cursor.close()
-		conn.close()
+		hash_password = password_hasher.hash_password(new_password)
+	except HasherBusy:
+		return _busy()
+	try:
+		with db_cursor() as cursor:
+			cursor.execute("UPDATE users SET password=%s WHERE id=%s",(hash_password, user_id))
+			cursor.connection.commit()
 		return jsonify({'Status':'Password Reset Sucess'}),200
 	except Exception as e:
 		return jsonify({'Status':'Password RESET Failed'}),500
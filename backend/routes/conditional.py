@@ -0,0 +1,56 @@
+"""
+Conditional GET for cacheable list endpoints
+============================================
+A view derives a strong ETag from a cheap version token, such as the catalog
+snapshot's content tag or the newest ``quiz_sessions.updated_at`` for a
+user, plus the request path and query string. It checks ``If-None-Match``
+*before* building the page, so a matching request gets a 304 without any
+row being filtered or serialised.
+
+Compressed responses get a ``-gzip`` / ``-br`` suffix on the same tag (see
+``compression``). An ``If-None-Match`` carrying any of these matches.
+"""
+
+import hashlib
+
+from flask import Response, request
+
+from compression import ENCODING_SUFFIXES
+
+
+def etag_for(*parts):
+    """Strong ETag (unquoted) for the current request and a version token."""
+    h = hashlib.sha1()
+    for part in (*parts, request.path, request.query_string):
+        h.update(part if isinstance(part, bytes) else str(part).encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()[:32]
+
+
+def _matching_tag(etag):
+    if_none_match = request.if_none_match
+    if not if_none_match:
+        return None
+    for candidate in (etag, *(etag + suffix for suffix in ENCODING_SUFFIXES)):
+        if if_none_match.contains_weak(candidate):
+            return candidate
+    return None
+
+
+def not_modified(etag, cache_control):
+    """A 304 for ``etag`` if the client already holds it, else None."""
+    matched = _matching_tag(etag)
+    if matched is None:
+        return None
+    # echo the representation the client holds (plain or compressed)
+    response = Response(status=304)
+    response.set_etag(matched)
+    response.headers['Cache-Control'] = cache_control
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def tag_response(response, etag, cache_control):
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response
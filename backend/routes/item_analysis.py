@@ -0,0 +1,209 @@
+"""
+Item and distractor analysis
+============================
+Classical test statistics per question, computed from ``quiz_attempts``:
+
+* option distribution – how often each of A–D was picked, and the mean
+  rest score of the learners who picked it (a working distractor attracts
+  weaker learners, so its mean is below the correct option's),
+* difficulty – the share answered correctly (p) and its logit
+  ``ln((1 - p) / p)`` (higher = harder), smoothed for tiny samples,
+* discrimination – the point-biserial correlation between answering the
+  item correctly and the *rest score* of the session it was answered in
+  (the session's score without this item, so the item is not correlated
+  with itself).
+
+Attempts are read in primary-key ranges of ``chunk_size``. MySQL reduces
+each range to one row of sums per question, and the sums are added up
+here, so memory depends on the number of questions rather than attempts,
+and no single query holds locks for long. Results are written to
+``quiz_item_analysis`` and served from there.
+"""
+
+import math
+
+OPTIONS = ('A', 'B', 'C', 'D')
+
+# share of picks below which a wrong option is not doing its job
+MIN_DISTRACTOR_SHARE = 0.05
+
+# per-question sums over one id range; r is the rest score, NULL for
+# one-question sessions where it is undefined
+CHUNK_SUMS_SQL = '''
+    SELECT quiz_id,
+           COUNT(*)                              AS n,
+           SUM(x)                                AS sx,
+           COUNT(r)                              AS nr,
+           SUM(CASE WHEN r IS NOT NULL THEN x END) AS sxr,
+           SUM(r)                                AS sy,
+           SUM(r * r)                            AS syy,
+           SUM(x * r)                            AS sxy,
+           SUM(opt='A') AS n_a, SUM(opt='B') AS n_b, SUM(opt='C') AS n_c, SUM(opt='D') AS n_d,
+           SUM(IF(opt='A', r, NULL)) AS sy_a, SUM(IF(opt='B', r, NULL)) AS sy_b,
+           SUM(IF(opt='C', r, NULL)) AS sy_c, SUM(IF(opt='D', r, NULL)) AS sy_d,
+           SUM(opt='A' AND r IS NOT NULL) AS nr_a, SUM(opt='B' AND r IS NOT NULL) AS nr_b,
+           SUM(opt='C' AND r IS NOT NULL) AS nr_c, SUM(opt='D' AND r IS NOT NULL) AS nr_d
+    FROM (
+        SELECT qa.quiz_id, qa.is_correct AS x, qa.selected_option AS opt,
+               (s.correct_answers - qa.is_correct) / NULLIF(s.total_questions - 1, 0) AS r
+        FROM quiz_attempts qa
+        JOIN quiz_sessions s ON s.id = qa.session_id
+        WHERE qa.id > %s AND qa.id <= %s AND s.status = 'completed' {quiz_filter}
+    ) t
+    GROUP BY quiz_id
+'''
+
+STORE_SQL = '''
+    INSERT INTO quiz_item_analysis (
+        quiz_id, attempts, correct, difficulty_p, difficulty_logit, point_biserial,
+        picks_a, picks_b, picks_c, picks_d,
+        rest_score_a, rest_score_b, rest_score_c, rest_score_d
+    )
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        attempts = VALUES(attempts), correct = VALUES(correct),
+        difficulty_p = VALUES(difficulty_p), difficulty_logit = VALUES(difficulty_logit),
+        point_biserial = VALUES(point_biserial),
+        picks_a = VALUES(picks_a), picks_b = VALUES(picks_b),
+        picks_c = VALUES(picks_c), picks_d = VALUES(picks_d),
+        rest_score_a = VALUES(rest_score_a), rest_score_b = VALUES(rest_score_b),
+        rest_score_c = VALUES(rest_score_c), rest_score_d = VALUES(rest_score_d),
+        computed_at = CURRENT_TIMESTAMP
+'''
+
+_SUM_FIELDS = (
+    'n', 'sx', 'nr', 'sxr', 'sy', 'syy', 'sxy',
+    'n_a', 'n_b', 'n_c', 'n_d', 'sy_a', 'sy_b', 'sy_c', 'sy_d',
+    'nr_a', 'nr_b', 'nr_c', 'nr_d',
+)
+
+
+def point_biserial(n, sx, sy, syy, sxy):
+    """Pearson r between a 0/1 variable and a continuous one, from sums."""
+    if n < 2:
+        return None
+    p = sx / n
+    mean_y = sy / n
+    var_y = syy / n - mean_y * mean_y
+    var_x = p * (1 - p)
+    if var_x <= 0 or var_y <= 1e-12:
+        return None
+    return (sxy / n - p * mean_y) / math.sqrt(var_x * var_y)
+
+
+def _item(quiz_id, sums):
+    n, sx = sums['n'], sums['sx']
+    p = sx / n
+    # +0.5 / +1 keeps the logit finite when everyone (or no one) got it right
+    smoothed = (sx + 0.5) / (n + 1)
+    rest = {}
+    for opt in OPTIONS:
+        k = opt.lower()
+        rest[opt] = sums[f'sy_{k}'] / sums[f'nr_{k}'] if sums[f'nr_{k}'] else None
+    return {
+        'quiz_id': quiz_id,
+        'attempts': int(n),
+        'correct': int(sx),
+        'difficulty_p': round(p, 4),
+        'difficulty_logit': round(math.log((1 - smoothed) / smoothed), 4),
+        'point_biserial': _round(point_biserial(
+            sums['nr'], sums['sxr'], sums['sy'], sums['syy'], sums['sxy'],
+        )),
+        'picks': {opt: int(sums[f'n_{opt.lower()}']) for opt in OPTIONS},
+        'rest_score': {opt: _round(rest[opt]) for opt in OPTIONS},
+    }
+
+
+def _round(value):
+    return None if value is None else round(value, 4)
+
+
+def analyze_items(cursor, chunk_size=100000, quiz_id=None, progress=None):
+    """
+    Compute item statistics over all completed attempts (optionally of one
+    question). Returns a list of per-question dicts.
+    """
+    quiz_filter = 'AND qa.quiz_id=%s' if quiz_id is not None else ''
+    extra = [quiz_id] if quiz_id is not None else []
+    sql = CHUNK_SUMS_SQL.format(quiz_filter=quiz_filter)
+
+    cursor.execute('SELECT COALESCE(MIN(id), 1) - 1 AS lo, COALESCE(MAX(id), 0) AS hi FROM quiz_attempts')
+    bounds = cursor.fetchone()
+    lo, hi = bounds['lo'], bounds['hi']
+
+    totals = {}
+    while lo < hi:
+        upper = min(lo + chunk_size, hi)
+        cursor.execute(sql, [lo, upper] + extra)
+        for row in cursor.fetchall():
+            acc = totals.setdefault(row['quiz_id'], dict.fromkeys(_SUM_FIELDS, 0.0))
+            for field in _SUM_FIELDS:
+                if row[field] is not None:
+                    acc[field] += float(row[field])
+        if progress:
+            progress(upper, hi)
+        lo = upper
+
+    return [_item(qid, sums) for qid, sums in sorted(totals.items()) if sums['n']]
+
+
+def store_item_analysis(cursor, items, replace_all=False):
+    """Save analyze_items() results; ``replace_all`` drops rows not in ``items``."""
+    if replace_all:
+        cursor.execute('DELETE FROM quiz_item_analysis')
+    cursor.executemany(STORE_SQL, [
+        (
+            item['quiz_id'], item['attempts'], item['correct'],
+            item['difficulty_p'], item['difficulty_logit'], item['point_biserial'],
+            *(item['picks'][opt] for opt in OPTIONS),
+            *(item['rest_score'][opt] for opt in OPTIONS),
+        )
+        for item in items
+    ])
+    return len(items)
+
+
+def distractor_report(row):
+    """Shape a stored quiz_item_analysis row (joined with quiz) for the API."""
+    attempts = row['attempts'] or 0
+    correct_option = row['correct_option']
+    options = []
+    flags = []
+    for opt in OPTIONS:
+        k = opt.lower()
+        picks = row[f'picks_{k}']
+        share = picks / attempts if attempts else 0.0
+        rest = row[f'rest_score_{k}']
+        options.append({
+            'option': opt,
+            'text': row[f'option_{k}'],
+            'is_correct': opt == correct_option,
+            'picks': picks,
+            'share': round(share, 4),
+            'mean_rest_score': None if rest is None else float(rest),
+        })
+        if opt == correct_option or not attempts:
+            continue
+        if share < MIN_DISTRACTOR_SHARE:
+            flags.append(f'distractor {opt} rarely chosen')
+        if picks > row[f'picks_{correct_option.lower()}']:
+            flags.append(f'distractor {opt} chosen more than the key (possible miskey)')
+        correct_rest = row[f'rest_score_{correct_option.lower()}']
+        if rest is not None and correct_rest is not None and rest > correct_rest:
+            flags.append(f'distractor {opt} attracts stronger learners than the key')
+    if row['point_biserial'] is not None and row['point_biserial'] < 0:
+        flags.append('negative discrimination')
+
+    return {
+        'quiz_id': row['quiz_id'],
+        'level': row['level'],
+        'question_text': row['question_text'],
+        'correct_option': correct_option,
+        'attempts': attempts,
+        'difficulty_p': None if row['difficulty_p'] is None else float(row['difficulty_p']),
+        'difficulty_logit': None if row['difficulty_logit'] is None else float(row['difficulty_logit']),
+        'point_biserial': None if row['point_biserial'] is None else float(row['point_biserial']),
+        'options': options,
+        'flags': flags,
+        'computed_at': row['computed_at'],
+    }
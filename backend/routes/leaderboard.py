@@ -0,0 +1,105 @@
+"""
+Leaderboard queries
+===================
+``user_level_progress`` already is the materialised leaderboard: submit_session
+upserts each user's best score and correct total there. The
+``idx_progress_rank (level, best_score_percent DESC, total_correct DESC)``
+index keeps every level pre-sorted, so
+
+* a page of the leaderboard is an index range read of ``limit`` rows, and
+* a rank is ``1 + number of rows strictly ahead``, counted on the same index,
+
+which matches ``RANK() OVER (PARTITION BY level ...)`` without scanning and
+sorting the whole table.
+
+Counting the rows ahead is still a range read of every one of them, so it
+costs O(rank): cheap near the top, but a user at the bottom of a level
+reads the whole level's slice of the index. The count only touches
+``idx_progress_rank`` columns (rows exist only once a session has been
+submitted, so ``total_sessions > 0`` is implied), which keeps it an
+index-only scan without a row lookup per user. Admin pages are bounded by
+``MAX_OFFSET``; ``/me/rank`` is the unbounded case. If levels grow past a
+few hundred thousand players, keep a per-level count per
+``best_score_percent`` (at most 10001 values) and count only the user's own
+score group on the index.
+"""
+
+RANK_ORDER = 'ulp.best_score_percent DESC, ulp.total_correct DESC, ulp.id ASC'
+
+LEADERBOARD_COLUMNS = '''
+    ulp.level,
+    u.id           AS user_id,
+    u.name,
+    ulp.total_sessions,
+    ulp.total_questions_answered,
+    ulp.total_correct,
+    CASE WHEN ulp.total_questions_answered > 0
+         THEN ROUND((ulp.total_correct / ulp.total_questions_answered) * 100, 2)
+         ELSE 0
+    END AS overall_accuracy_percent,
+    ulp.best_score_percent,
+    ulp.last_played_at
+'''
+
+
+def _count_ahead(cursor, level, best_score, total_correct):
+    cursor.execute(
+        '''
+        SELECT COUNT(*) AS ahead
+        FROM user_level_progress
+        WHERE level=%s
+          AND (best_score_percent > %s
+               OR (best_score_percent = %s AND total_correct > %s))
+        ''',
+        (level, best_score, best_score, total_correct),
+    )
+    return cursor.fetchone()['ahead']
+
+
+def leaderboard_page(cursor, level, limit, offset=0):
+    """Rows ranked ``offset+1 .. offset+limit`` of ``level``, each with ``rank_in_level``."""
+    cursor.execute(
+        f'''
+        SELECT {LEADERBOARD_COLUMNS}
+        FROM user_level_progress ulp
+        JOIN users u ON u.id = ulp.user_id
+        WHERE ulp.level=%s AND ulp.total_sessions > 0
+        ORDER BY {RANK_ORDER}
+        LIMIT %s OFFSET %s
+        ''',
+        (level, limit, offset),
+    )
+    rows = cursor.fetchall()
+
+    # RANK() semantics: ties share the rank of the first row of their group
+    prev_key, rank = None, None
+    for position, row in enumerate(rows, start=offset + 1):
+        key = (row['best_score_percent'], row['total_correct'])
+        if key != prev_key:
+            if prev_key is None and offset > 0:
+                rank = _count_ahead(cursor, level, *key) + 1
+            else:
+                rank = position
+            prev_key = key
+        row['rank_in_level'] = rank
+    return rows
+
+
+def rank_of(cursor, user_id, level):
+    """The user's standing in ``level``, or None if they have not played it."""
+    cursor.execute(
+        f'''
+        SELECT {LEADERBOARD_COLUMNS}
+        FROM user_level_progress ulp
+        JOIN users u ON u.id = ulp.user_id
+        WHERE ulp.user_id=%s AND ulp.level=%s AND ulp.total_sessions > 0
+        ''',
+        (user_id, level),
+    )
+    row = cursor.fetchone()
+    if not row:
+        return None
+    row['rank_in_level'] = _count_ahead(
+        cursor, level, row['best_score_percent'], row['total_correct']
+    ) + 1
+    return row
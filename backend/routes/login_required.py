@@ -1,5 +1,29 @@
+import os
+import time
 from functools import wraps
 from flask import session,jsonify
+from db import db_cursor
+
+# the role is kept in the signed session cookie, so admin checks cost no
+# query; it is re-read from the database at most every ROLE_RECHECK_SECONDS
+# so a demoted admin loses access without having to log out
+ROLE_RECHECK_SECONDS = int(os.getenv('ROLE_RECHECK_SECONDS', 300))
+
+
+def remember_role(role):
+    session['role'] = role
+    session['role_checked_at'] = int(time.time())
+
+
+def _session_role():
+    checked_at = session.get('role_checked_at', 0)
+    if 'role' not in session or time.time() - checked_at > ROLE_RECHECK_SECONDS:
+        with db_cursor() as cursor:
+            cursor.execute('SELECT role FROM users WHERE id=%s', (session['user_id'],))
+            user = cursor.fetchone()
+        remember_role(user['role'] if user else None)
+    return session['role']
+
 
 def login_required(f):
     @wraps(f)
@@ -7,4 +31,15 @@ def login_required(f):
         if 'user_id' not in session:
             return jsonify({'Status':'unauthorized'}),401
         return f(*args, **kwargs)
-    return decorated_function
\ No newline at end of file
+    return decorated_function
+
+
+def admin_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            return jsonify({'Status':'unauthorized'}),401
+        if _session_role() != 'admin':
+            return jsonify({'Status': 'forbidden'}), 403
+        return f(*args, **kwargs)
+    return decorated_function
@@ -0,0 +1,73 @@
+"""
+Operational admin routes
+========================
+GET    /api/admin/metrics                – SQL / request histograms and pool
+                                           gauges in Prometheus text format
+GET    /api/admin/profiler               – sampling profiler status
+PUT    /api/admin/profiler               – set the share of an endpoint's
+                                           requests to profile (0 stops it)
+DELETE /api/admin/profiler               – stop profiling everything
+GET    /api/admin/profiler/stacks        – collapsed stacks from all workers
+                                           (?reset=1 clears)
+"""
+
+from flask import Blueprint, Response, current_app, jsonify, request
+
+from instrumentation import render_prometheus
+from profiling import profiler
+from routes.login_required import admin_required
+
+ops = Blueprint('ops', __name__)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+@ops.route('/admin/metrics', methods=['GET'])
+@admin_required
+def admin_metrics():
+    return Response(render_prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@ops.route('/admin/profiler', methods=['GET'])
+@admin_required
+def profiler_status():
+    return jsonify(profiler.status()), 200
+
+
+@ops.route('/admin/profiler', methods=['PUT'])
+@admin_required
+def profiler_configure():
+    """
+    Body: { "endpoint": "progress.submit_session", "percent": 10 }
+    Stored in profiler_rates; every worker picks it up within
+    PROFILER_POLL_SECONDS.
+    """
+    data = request.get_json(silent=True) or {}
+    endpoint = data.get('endpoint')
+    if endpoint not in current_app.view_functions:
+        return jsonify({'Status': 'unknown endpoint', 'endpoints': sorted(current_app.view_functions)}), 400
+    try:
+        percent = float(data.get('percent', 0))
+    except (TypeError, ValueError):
+        percent = -1
+    if not 0 <= percent <= 100:
+        return jsonify({'Status': 'percent must be between 0 and 100'}), 400
+
+    profiler.set_rate(endpoint, percent)
+    return jsonify(profiler.status()), 200
+
+
+@ops.route('/admin/profiler', methods=['DELETE'])
+@admin_required
+def profiler_disable():
+    profiler.disable()
+    return jsonify(profiler.status()), 200
+
+
+@ops.route('/admin/profiler/stacks', methods=['GET'])
+@admin_required
+def profiler_stacks():
+    body = profiler.collapsed()
+    if request.args.get('reset') == '1':
+        profiler.reset()
+    return Response(body, content_type='text/plain; charset=utf-8')
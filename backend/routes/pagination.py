@@ -0,0 +1,57 @@
+"""
+Cursor (keyset) pagination helpers
+==================================
+List endpoints return the token for the next page in the ``X-Next-Cursor``
+response header; clients pass it back as ``?cursor=`` to continue. The
+token is an opaque url-safe base64 of the sort key of the last row served,
+so the next page starts right after it instead of skipping ``offset`` rows.
+"""
+
+import base64
+import datetime
+import json
+
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+MAX_OFFSET = 1000
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _default(value):
+    if isinstance(value, datetime.datetime):
+        return {'dt': value.isoformat()}
+    raise TypeError(f'cannot encode {type(value).__name__} in a cursor')
+
+
+def _hook(obj):
+    if 'dt' in obj:
+        return datetime.datetime.fromisoformat(obj['dt'])
+    return obj
+
+
+def encode_cursor(*key):
+    raw = json.dumps(list(key), default=_default, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, size):
+    """Decode a token produced by ``encode_cursor`` with ``size`` key parts."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded), object_hook=_hook)
+    except (ValueError, TypeError):
+        raise InvalidCursor('invalid cursor')
+    if not isinstance(key, list) or len(key) != size:
+        raise InvalidCursor('invalid cursor')
+    return key
+
+
+def clamp(raw, default, maximum, minimum=0):
+    """Parse an int query param and clamp it into [minimum, maximum]; bad input gets ``default``."""
+    try:
+        value = int(raw) if raw not in (None, '') else default
+    except (TypeError, ValueError):
+        value = default
+    return min(max(value, minimum), maximum)
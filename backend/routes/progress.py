@@ -12,47 +12,233 @@ Progress (logged-in user)
 GET /api/progress/me                     – overall stats
 GET /api/progress/me/levels              – per-level breakdown
 GET /api/progress/me/history             – paginated session history
+GET /api/progress/me/rank                – own leaderboard rank per level
 
 Admin analytics
 ---------------
 GET /api/admin/analytics                 – all users' stats summary
 GET /api/admin/analytics/leaderboard     – top scorers per level
 GET /api/admin/analytics/user/<user_id>  – specific user detail
+GET /api/admin/analytics/quiz-stats      – per-question correct rate
+GET /api/admin/analytics/item-analysis   – distractor / discrimination report
 """
 
+import click
 from flask import Blueprint, jsonify, request, session
-import pymysql
-from db import connect_db
-from routes.login_required import login_required
+from db import db_cursor
+from routes.login_required import admin_required, login_required
+from routes.conditional import etag_for, not_modified, tag_response
+from routes.export import EXPORT_FORMATS, stream_export
+from routes.item_analysis import analyze_items, distractor_report, store_item_analysis
+from routes.leaderboard import leaderboard_page, rank_of
+from routes.pagination import (
+    MAX_OFFSET, NEXT_CURSOR_HEADER, InvalidCursor, clamp, decode_cursor, encode_cursor,
+)
+from quiz.adaptive import adaptive_questions
+from quiz.answer_keys import encode_key, forget_answer_key, load_answer_key, remember_answer_key
+from quiz.catalog import catalog_cache
+from quiz.sampler import sample_questions
+from quiz.scheduler import record_reviews, review_questions
 
 progress = Blueprint('progress', __name__)
 
 VALID_LEVELS = ['easy', 'intermediate', 'hard']
+SESSION_MODES = ['practice', 'review', 'adaptive']
+HISTORY_CACHE_CONTROL = 'private, no-cache'
+SESSION_QUESTION_FIELDS = [
+    'id', 'level', 'question_text',
+    'option_a', 'option_b', 'option_c', 'option_d', 'explanation',
+]
+
+# pymysql rewrites executemany() of a plain INSERT ... VALUES into a single
+# multi-row statement, so all attempts of a submit cost one round trip
+INSERT_ATTEMPTS_SQL = '''
+    INSERT IGNORE INTO quiz_attempts
+        (session_id, user_id, quiz_id, selected_option, is_correct)
+    VALUES (%s, %s, %s, %s, %s)
+'''
+
+# creates the (user, level) row on first play and applies the increments
+# atomically on the uq_user_level key, so concurrent submits cannot race
+UPSERT_LEVEL_PROGRESS_SQL = '''
+    INSERT INTO user_level_progress
+        (user_id, level, total_sessions, total_questions_answered,
+         total_correct, best_score_percent, last_played_at)
+    VALUES (%s, %s, 1, %s, %s, %s, CURRENT_TIMESTAMP)
+    ON DUPLICATE KEY UPDATE
+        total_sessions           = total_sessions + 1,
+        total_questions_answered = total_questions_answered + VALUES(total_questions_answered),
+        total_correct            = total_correct + VALUES(total_correct),
+        best_score_percent       = GREATEST(best_score_percent, VALUES(best_score_percent)),
+        last_played_at           = CURRENT_TIMESTAMP
+'''
+
+# per-user totals over completed sessions, kept current by submit_session so
+# the overview endpoints read one row instead of aggregating all sessions
+UPSERT_PROGRESS_SUMMARY_SQL = '''
+    INSERT INTO user_progress_summary
+        (user_id, total_sessions, total_questions, total_correct,
+         score_sum, best_score_percent, last_played_at)
+    VALUES (%s, 1, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+    ON DUPLICATE KEY UPDATE
+        total_sessions     = total_sessions + 1,
+        total_questions    = total_questions + VALUES(total_questions),
+        total_correct      = total_correct + VALUES(total_correct),
+        score_sum          = score_sum + VALUES(score_sum),
+        best_score_percent = GREATEST(best_score_percent, VALUES(best_score_percent)),
+        last_played_at     = CURRENT_TIMESTAMP
+'''
+
+# per-question rollup read by admin_quiz_stats; all placeholders so that
+# executemany() batches it, and rows go in quiz_id order so concurrent
+# submits lock shared quiz_stats rows in the same order
+UPSERT_QUIZ_STATS_SQL = '''
+    INSERT INTO quiz_stats
+        (quiz_id, attempts, correct, selected_a, selected_b, selected_c, selected_d)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        attempts   = attempts + VALUES(attempts),
+        correct    = correct + VALUES(correct),
+        selected_a = selected_a + VALUES(selected_a),
+        selected_b = selected_b + VALUES(selected_b),
+        selected_c = selected_c + VALUES(selected_c),
+        selected_d = selected_d + VALUES(selected_d)
+'''
+
+# quiz_stats aggregated straight from quiz_attempts, for reconciliation
+QUIZ_STATS_FROM_ATTEMPTS_SQL = '''
+    SELECT quiz_id, COUNT(*) AS attempts, SUM(is_correct) AS correct,
+           SUM(selected_option='A') AS selected_a, SUM(selected_option='B') AS selected_b,
+           SUM(selected_option='C') AS selected_c, SUM(selected_option='D') AS selected_d
+    FROM quiz_attempts
+    WHERE quiz_id BETWEEN %s AND %s
+    GROUP BY quiz_id
+'''
+QUIZ_STATS_COUNTERS = ('attempts', 'correct', 'selected_a', 'selected_b', 'selected_c', 'selected_d')
+REBUILD_QUIZ_STATS_CHUNK = 200
+
+# summary columns exposed under the names the endpoints always returned
+SUMMARY_COLUMNS = '''
+    COALESCE(ps.total_sessions, 0)                                  AS total_sessions,
+    COALESCE(ps.total_questions, 0)                                 AS total_questions_attempted,
+    COALESCE(ps.total_correct, 0)                                   AS total_correct,
+    COALESCE(ROUND(ps.score_sum / NULLIF(ps.total_sessions, 0), 2), 0) AS avg_score_percent,
+    COALESCE(ps.best_score_percent, 0)                              AS best_score_percent,
+    ps.last_played_at                                               AS last_played_at
+'''
 
 
 # ---------------------------------------------------------------------------
 # helpers
 # ---------------------------------------------------------------------------
 
-def _is_admin(cursor, user_id):
-    cursor.execute('SELECT role FROM users WHERE id=%s', (user_id,))
-    user = cursor.fetchone()
-    return bool(user and user.get('role') == 'admin')
-
-
-def _get_or_create_level_progress(cursor, user_id, level):
-    """Return user_level_progress row, creating it if it doesn't exist."""
+def rebuild_progress_summary(cursor, user_id=None):
+    """Recompute user_progress_summary from raw completed sessions."""
+    user_filter = 'AND user_id=%s' if user_id is not None else ''
+    params = [user_id] if user_id is not None else []
+    cursor.execute(f'DELETE FROM user_progress_summary WHERE 1=1 {user_filter}', params)
     cursor.execute(
-        'SELECT id FROM user_level_progress WHERE user_id=%s AND level=%s',
-        (user_id, level),
+        f'''
+        INSERT INTO user_progress_summary
+            (user_id, total_sessions, total_questions, total_correct,
+             score_sum, best_score_percent, last_played_at)
+        SELECT user_id, COUNT(*), SUM(total_questions), SUM(correct_answers),
+               SUM(score_percent), MAX(score_percent), MAX(completed_at)
+        FROM quiz_sessions
+        WHERE status='completed' {user_filter}
+        GROUP BY user_id
+        ''',
+        params,
     )
-    row = cursor.fetchone()
-    if not row:
+    return cursor.rowcount
+
+
+def rebuild_quiz_stats(cursor, quiz_id=None, chunk_size=REBUILD_QUIZ_STATS_CHUNK):
+    """
+    Reconcile quiz_stats with raw attempts. Returns (questions checked,
+    rows that had drifted).
+
+    Works through quiz ids ``chunk_size`` at a time. For each chunk the
+    attempt aggregate and the stored counters are read in one consistent,
+    non-locking snapshot, so submits are never blocked. Each drift is then
+    applied as a delta through the submit upsert in a short transaction.
+    Increments committed after the snapshot are in both sides and are kept.
+    Commits as it goes.
+    """
+    if quiz_id is not None:
+        lo = hi = quiz_id
+    else:
+        cursor.execute('SELECT MIN(id) AS lo, MAX(id) AS hi FROM quiz')
+        bounds = cursor.fetchone()
+        if bounds['lo'] is None:
+            return 0, 0
+        lo, hi = bounds['lo'], bounds['hi']
+
+    checked = drifted = 0
+    for start in range(lo, hi + 1, chunk_size):
+        stop = min(start + chunk_size - 1, hi)
+        cursor.connection.commit()
+        cursor.execute('START TRANSACTION WITH CONSISTENT SNAPSHOT')
+        cursor.execute(QUIZ_STATS_FROM_ATTEMPTS_SQL, (start, stop))
+        actual = {row['quiz_id']: row for row in cursor.fetchall()}
         cursor.execute(
-            'INSERT INTO user_level_progress (user_id, level) VALUES (%s, %s)',
-            (user_id, level),
+            f"SELECT quiz_id, {', '.join(QUIZ_STATS_COUNTERS)} FROM quiz_stats WHERE quiz_id BETWEEN %s AND %s",
+            (start, stop),
         )
-    return cursor.lastrowid
+        stored = {row['quiz_id']: row for row in cursor.fetchall()}
+        cursor.connection.commit()
+
+        deltas = []
+        for qid in sorted(actual.keys() | stored.keys()):
+            delta = [
+                int((actual.get(qid) or {}).get(col) or 0) - int((stored.get(qid) or {}).get(col) or 0)
+                for col in QUIZ_STATS_COUNTERS
+            ]
+            if any(delta):
+                deltas.append((qid, *delta))
+        checked += len(actual.keys() | stored.keys())
+        drifted += len(deltas)
+        if deltas:
+            # a question deleted since the snapshot has no stats row to fix
+            existing = existing_quiz_ids(cursor, [d[0] for d in deltas])
+            cursor.executemany(UPSERT_QUIZ_STATS_SQL, [d for d in deltas if d[0] in existing])
+            cursor.connection.commit()
+    return checked, drifted
+
+
+@progress.cli.command('rebuild-summary')
+@click.option('--user-id', type=int, default=None, help='Only rebuild this user.')
+def rebuild_progress_summary_command(user_id):
+    """Backfill / reconcile user_progress_summary from quiz_sessions."""
+    with db_cursor() as cursor:
+        rows = rebuild_progress_summary(cursor, user_id)
+        cursor.connection.commit()
+    click.echo(f'Rebuilt progress summary for {rows} user(s).')
+
+
+@progress.cli.command('rebuild-quiz-stats')
+@click.option('--quiz-id', type=int, default=None, help='Only rebuild this question.')
+def rebuild_quiz_stats_command(quiz_id):
+    """Backfill / reconcile quiz_stats from quiz_attempts (safe to run from cron)."""
+    with db_cursor() as cursor:
+        rows, drifted = rebuild_quiz_stats(cursor, quiz_id)
+    click.echo(f'Checked quiz stats for {rows} question(s); {drifted} had drifted and were corrected.')
+
+
+@progress.cli.command('analyze-items')
+@click.option('--quiz-id', type=int, default=None, help='Only analyse this question.')
+@click.option('--chunk-size', type=int, default=100000, show_default=True,
+              help='quiz_attempts ids read per query.')
+def analyze_items_command(quiz_id, chunk_size):
+    """Recompute difficulty, discrimination and distractor stats per question."""
+    def report(done, total):
+        click.echo(f'  attempts up to id {done} of {total}', err=True)
+
+    with db_cursor() as cursor:
+        items = analyze_items(cursor, chunk_size=chunk_size, quiz_id=quiz_id, progress=report)
+        store_item_analysis(cursor, items, replace_all=quiz_id is None)
+        cursor.connection.commit()
+    click.echo(f'Analysed {len(items)} question(s).')
 
 
 # ---------------------------------------------------------------------------
@@ -62,64 +248,82 @@ def _get_or_create_level_progress(cursor, user_id, level):
 @login_required
 def start_session():
     """
-    Body: { "level": "easy", "question_count": 5 }
+    Body: { "level": "easy", "question_count": 5,
+            "mode": "practice" | "review" | "adaptive", "seed": optional }
     Returns the session id and the quiz questions (without correct_option).
+    "practice" (default) draws questions at random; "review" serves the
+    user's spaced-repetition due questions first, then unseen ones;
+    "adaptive" weights the draw towards questions matched to the user's
+    accuracy at the level.
     """
     data = request.json or {}
     level = data.get('level', '').lower()
     question_count = int(data.get('question_count', 5))
+    mode = (data.get('mode') or 'practice').lower()
 
     if level not in VALID_LEVELS:
         return jsonify({'Status': 'level must be easy, intermediate, or hard'}), 400
     if not (1 <= question_count <= 20):
         return jsonify({'Status': 'question_count must be between 1 and 20'}), 400
+    if mode not in SESSION_MODES:
+        return jsonify({'Status': 'mode must be practice, review, or adaptive'}), 400
 
     user_id = session['user_id']
-    conn = connect_db()
+    fields = SESSION_QUESTION_FIELDS + ['correct_option']
     try:
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
-        cursor.execute('USE Bhasabridge')
-
-        # pick random questions for the requested level
-        cursor.execute(
-            '''
-            SELECT id, level, question_text,
-                   option_a, option_b, option_c, option_d, explanation
-            FROM quiz
-            WHERE level=%s
-            ORDER BY RAND()
-            LIMIT %s
-            ''',
-            (level, question_count),
-        )
-        questions = cursor.fetchall()
-
-        if not questions:
-            return jsonify({'Status': 'No quiz questions found for this level'}), 404
-
-        # create session row
-        cursor.execute(
-            '''
-            INSERT INTO quiz_sessions (user_id, level, total_questions)
-            VALUES (%s, %s, %s)
-            ''',
-            (user_id, level, len(questions)),
-        )
-        conn.commit()
-        session_id = cursor.lastrowid
-
-        return jsonify({
-            'session_id': session_id,
-            'level': level,
-            'total_questions': len(questions),
-            'questions': questions,
-        }), 201
+        # read before checking out a connection: a snapshot reload needs its own
+        snap = catalog_cache.snapshot()
+        with db_cursor() as cursor:
+            if mode == 'review':
+                questions = review_questions(cursor, user_id, level, question_count, fields, snapshot=snap)
+            elif mode == 'adaptive':
+                questions = adaptive_questions(
+                    cursor, user_id, level, question_count, fields, seed=data.get('seed'), snapshot=snap
+                )
+            else:
+                # pick random questions for the requested level
+                questions = sample_questions(level, question_count, fields, seed=data.get('seed'), snapshot=snap)
+            if not questions:
+                return jsonify({'Status': 'No quiz questions found for this level'}), 404
+
+            # the answer key stays server-side; submit grades from it
+            answer_key = {q['id']: q.pop('correct_option') for q in questions}
+
+            # create session row
+            cursor.execute(
+                '''
+                INSERT INTO quiz_sessions (user_id, level, mode, total_questions, answer_key)
+                VALUES (%s, %s, %s, %s, %s)
+                ''',
+                (user_id, level, mode, len(questions), encode_key(answer_key)),
+            )
+            cursor.connection.commit()
+            session_id = cursor.lastrowid
+            remember_answer_key(session_id, answer_key)
+
+            return jsonify({
+                'session_id': session_id,
+                'level': level,
+                'mode': mode,
+                'total_questions': len(questions),
+                'questions': questions,
+            }), 201
     except Exception as e:
-        conn.rollback()
         return jsonify({'Status': 'Error', 'error': str(e)}), 500
-    finally:
-        cursor.close()
-        conn.close()
+
+
+def existing_quiz_ids(cursor, quiz_ids):
+    """
+    The ids in ``quiz_ids`` whose question still exists, share-locked until
+    commit so an admin delete cannot remove them before the attempts and
+    rollups that reference them are written.
+    """
+    if not quiz_ids:
+        return set()
+    ids = sorted(quiz_ids)
+    fmt = ','.join(['%s'] * len(ids))
+    cursor.execute(f'SELECT id FROM quiz WHERE id IN ({fmt}) LOCK IN SHARE MODE', ids)
+    return {row['id'] for row in cursor.fetchall()}
 
 
 # ---------------------------------------------------------------------------
@@ -130,7 +334,9 @@ def start_session():
 def submit_session(session_id):
     """
     Body: { "answers": [{"quiz_id": 1, "selected_option": "A"}, ...] }
-    Marks each attempt, finalises score and updates aggregated progress.
+    Marks each attempt against the answer key stored when the session was
+    started, finalises score and updates aggregated progress. Answers to
+    questions that were not served in this session are rejected.
     """
     data = request.json or {}
     answers = data.get('answers', [])
@@ -139,112 +345,129 @@ def submit_session(session_id):
     if not answers:
         return jsonify({'Status': 'answers list is required'}), 400
 
-    conn = connect_db()
     try:
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
-        cursor.execute('USE Bhasabridge')
-
-        # verify session belongs to user and is still in progress
-        cursor.execute(
-            'SELECT * FROM quiz_sessions WHERE id=%s AND user_id=%s',
-            (session_id, user_id),
-        )
-        sess_row = cursor.fetchone()
-        if not sess_row:
-            return jsonify({'Status': 'Session not found'}), 404
-        if sess_row['status'] != 'in_progress':
-            return jsonify({'Status': f"Session already {sess_row['status']}"}), 409
-
-        level = sess_row['level']
-
-        # fetch correct answers for the submitted quiz ids
-        quiz_ids = [a['quiz_id'] for a in answers if 'quiz_id' in a]
-        if not quiz_ids:
-            return jsonify({'Status': 'No valid quiz_id values in answers'}), 400
-
-        fmt = ','.join(['%s'] * len(quiz_ids))
-        cursor.execute(
-            f'SELECT id, correct_option FROM quiz WHERE id IN ({fmt})',
-            quiz_ids,
-        )
-        correct_map = {r['id']: r['correct_option'] for r in cursor.fetchall()}
-
-        results = []
-        correct_count = 0
-
-        for ans in answers:
-            qid = ans.get('quiz_id')
-            selected = str(ans.get('selected_option', '')).upper()
-            if qid not in correct_map or selected not in ('A', 'B', 'C', 'D'):
-                continue
-
-            is_correct = int(correct_map[qid] == selected)
-            correct_count += is_correct
-
-            # insert attempt (ignore duplicates – idempotent)
+        with db_cursor() as cursor:
+            # serialise this user's submits: record_reviews' locking read takes
+            # gap locks on new (user, quiz) keys, and two sessions upserting
+            # into the same gap would deadlock. Taken first, before the
+            # attempts insert takes a shared FK lock on the same row.
+            cursor.execute('SELECT id FROM users WHERE id=%s FOR UPDATE', (user_id,))
+
+            # verify session belongs to user and is still in progress
+            # (row lock stops two concurrent submits of the same session)
             cursor.execute(
                 '''
-                INSERT IGNORE INTO quiz_attempts
-                    (session_id, user_id, quiz_id, selected_option, is_correct)
-                VALUES (%s, %s, %s, %s, %s)
+                SELECT id, level, total_questions, status, answer_key
+                FROM quiz_sessions
+                WHERE id=%s AND user_id=%s
+                FOR UPDATE
                 ''',
-                (session_id, user_id, qid, selected, is_correct),
+                (session_id, user_id),
+            )
+            sess_row = cursor.fetchone()
+            if not sess_row:
+                return jsonify({'Status': 'Session not found'}), 404
+            if sess_row['status'] != 'in_progress':
+                return jsonify({'Status': f"Session already {sess_row['status']}"}), 409
+
+            level = sess_row['level']
+
+            quiz_ids = [a['quiz_id'] for a in answers if 'quiz_id' in a]
+            if not quiz_ids:
+                return jsonify({'Status': 'No valid quiz_id values in answers'}), 400
+
+            deleted = 0
+            correct_map = load_answer_key(session_id, sess_row['answer_key'])
+            if correct_map is None:
+                # session started before answer keys were stored
+                fmt = ','.join(['%s'] * len(quiz_ids))
+                cursor.execute(
+                    f'SELECT id, correct_option FROM quiz WHERE id IN ({fmt}) LOCK IN SHARE MODE',
+                    quiz_ids,
+                )
+                correct_map = {r['id']: r['correct_option'] for r in cursor.fetchall()}
+            else:
+                not_served = [qid for qid in quiz_ids if qid not in correct_map]
+                if not_served:
+                    return jsonify({
+                        'Status': 'answers include questions not served in this session',
+                        'quiz_ids': not_served,
+                    }), 400
+                # questions deleted since the session started are not graded
+                # (the legacy path above never sees them either)
+                existing = existing_quiz_ids(cursor, correct_map)
+                deleted = len(correct_map) - len(existing)
+                correct_map = {qid: option for qid, option in correct_map.items() if qid in existing}
+
+            results = []
+            attempt_rows = []
+            graded = set()
+            correct_count = 0
+
+            for ans in answers:
+                qid = ans.get('quiz_id')
+                selected = str(ans.get('selected_option', '')).upper()
+                if qid not in correct_map or qid in graded or selected not in ('A', 'B', 'C', 'D'):
+                    continue
+                graded.add(qid)
+
+                is_correct = int(correct_map[qid] == selected)
+                correct_count += is_correct
+                attempt_rows.append((session_id, user_id, qid, selected, is_correct))
+
+                results.append({
+                    'quiz_id': qid,
+                    'selected_option': selected,
+                    'correct_option': correct_map[qid],
+                    'is_correct': bool(is_correct),
+                })
+
+            # insert all attempts in one multi-row statement (ignore duplicates – idempotent)
+            if attempt_rows:
+                cursor.executemany(INSERT_ATTEMPTS_SQL, attempt_rows)
+                cursor.executemany(UPSERT_QUIZ_STATS_SQL, sorted(
+                    (qid, 1, is_correct, selected == 'A', selected == 'B', selected == 'C', selected == 'D')
+                    for _, _, qid, selected, is_correct in attempt_rows
+                ))
+                # advance each question's spaced-repetition schedule
+                record_reviews(cursor, user_id, level, [(qid, is_correct) for _, _, qid, _, is_correct in attempt_rows])
+
+            # attempts, quiz_stats, the review schedule and the score only
+            # cover questions that still exist: their rows reference quiz(id)
+            total = sess_row['total_questions'] - deleted
+            score_percent = round((correct_count / total) * 100, 2) if total else 0
+
+            # finalise session
+            cursor.execute(
+                '''
+                UPDATE quiz_sessions
+                SET total_questions=%s,
+                    correct_answers=%s,
+                    score_percent=%s,
+                    status='completed',
+                    completed_at=CURRENT_TIMESTAMP
+                WHERE id=%s
+                ''',
+                (total, correct_count, score_percent, session_id),
             )
 
-            results.append({
-                'quiz_id': qid,
-                'selected_option': selected,
-                'correct_option': correct_map[qid],
-                'is_correct': bool(is_correct),
-            })
-
-        total = sess_row['total_questions']
-        score_percent = round((correct_count / total) * 100, 2) if total else 0
-
-        # finalise session
-        cursor.execute(
-            '''
-            UPDATE quiz_sessions
-            SET correct_answers=%s,
-                score_percent=%s,
-                status='completed',
-                completed_at=CURRENT_TIMESTAMP
-            WHERE id=%s
-            ''',
-            (correct_count, score_percent, session_id),
-        )
-
-        # upsert aggregated level progress
-        _get_or_create_level_progress(cursor, user_id, level)
-        cursor.execute(
-            '''
-            UPDATE user_level_progress
-            SET total_sessions           = total_sessions + 1,
-                total_questions_answered = total_questions_answered + %s,
-                total_correct            = total_correct + %s,
-                best_score_percent       = GREATEST(best_score_percent, %s),
-                last_played_at           = CURRENT_TIMESTAMP
-            WHERE user_id=%s AND level=%s
-            ''',
-            (total, correct_count, score_percent, user_id, level),
-        )
-
-        conn.commit()
-
-        return jsonify({
-            'session_id': session_id,
-            'level': level,
-            'total_questions': total,
-            'correct_answers': correct_count,
-            'score_percent': score_percent,
-            'results': results,
-        }), 200
+            # upsert aggregated level progress in one atomic statement
+            cursor.execute(UPSERT_LEVEL_PROGRESS_SQL, (user_id, level, total, correct_count, score_percent))
+            cursor.execute(UPSERT_PROGRESS_SUMMARY_SQL, (user_id, total, correct_count, score_percent, score_percent))
+
+            cursor.connection.commit()
+            forget_answer_key(session_id)
+
+            return jsonify({
+                'session_id': session_id,
+                'level': level,
+                'total_questions': total,
+                'correct_answers': correct_count,
+                'score_percent': score_percent,
+                'results': results,
+            }), 200
     except Exception as e:
-        conn.rollback()
         return jsonify({'Status': 'Error', 'error': str(e)}), 500
-    finally:
-        cursor.close()
-        conn.close()
 
 
 # ---------------------------------------------------------------------------
@@ -255,22 +478,16 @@ def submit_session(session_id):
 def abandon_session(session_id):
     """Mark a session as abandoned (e.g. user navigated away)."""
     user_id = session['user_id']
-    conn = connect_db()
-    try:
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
-        cursor.execute('USE Bhasabridge')
-
+    with db_cursor() as cursor:
         cursor.execute(
             "UPDATE quiz_sessions SET status='abandoned' WHERE id=%s AND user_id=%s AND status='in_progress'",
             (session_id, user_id),
         )
         if cursor.rowcount == 0:
             return jsonify({'Status': 'Session not found or already finalised'}), 404
-        conn.commit()
+        cursor.connection.commit()
+        forget_answer_key(session_id)
         return jsonify({'Status': 'Session abandoned'}), 200
-    finally:
-        cursor.close()
-        conn.close()
 
 
 # ===========================================================================
@@ -285,27 +502,13 @@ def abandon_session(session_id):
 def my_overall_progress():
     """Overall quiz stats for the logged-in user."""
     user_id = session['user_id']
-    conn = connect_db()
-    try:
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
-        cursor.execute('USE Bhasabridge')
-
+    with db_cursor() as cursor:
         cursor.execute(
-            '''
-            SELECT
-                u.name,
-                u.email,
-                COUNT(DISTINCT qs.id)                            AS total_sessions,
-                COALESCE(SUM(qs.total_questions), 0)             AS total_questions_attempted,
-                COALESCE(SUM(qs.correct_answers), 0)             AS total_correct,
-                COALESCE(ROUND(AVG(qs.score_percent), 2), 0)     AS avg_score_percent,
-                COALESCE(MAX(qs.score_percent), 0)               AS best_score_percent,
-                MAX(qs.completed_at)                             AS last_played_at
+            f'''
+            SELECT u.name, u.email, {SUMMARY_COLUMNS}
             FROM users u
-            LEFT JOIN quiz_sessions qs
-                   ON qs.user_id = u.id AND qs.status = 'completed'
+            LEFT JOIN user_progress_summary ps ON ps.user_id = u.id
             WHERE u.id = %s
-            GROUP BY u.id
             ''',
             (user_id,),
         )
@@ -313,9 +516,6 @@ def my_overall_progress():
         if not row:
             return jsonify({'Status': 'User not found'}), 404
         return jsonify(row), 200
-    finally:
-        cursor.close()
-        conn.close()
 
 
 # ---------------------------------------------------------------------------
@@ -326,11 +526,7 @@ def my_overall_progress():
 def my_level_progress():
     """Per-level aggregated progress for the logged-in user."""
     user_id = session['user_id']
-    conn = connect_db()
-    try:
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
-        cursor.execute('USE Bhasabridge')
-
+    with db_cursor() as cursor:
         cursor.execute(
             '''
             SELECT
@@ -352,9 +548,6 @@ def my_level_progress():
         )
         rows = cursor.fetchall()
         return jsonify(rows), 200
-    finally:
-        cursor.close()
-        conn.close()
 
 
 # ---------------------------------------------------------------------------
@@ -364,14 +557,17 @@ def my_level_progress():
 @login_required
 def my_session_history():
     """
-    Paginated list of completed quiz sessions for the logged-in user.
-    Query params: level, status, limit (default 20), offset (default 0)
+    Paginated list of completed quiz sessions for the logged-in user, newest first.
+    Query params: level, status, limit (default 20, max 100),
+                  cursor (from the X-Next-Cursor header of the previous page)
+    The legacy offset param is still accepted (capped) when no cursor is sent.
     """
     user_id = session['user_id']
     level   = request.args.get('level')
     status  = request.args.get('status')
-    limit   = int(request.args.get('limit', 20))
-    offset  = int(request.args.get('offset', 0))
+    limit   = clamp(request.args.get('limit'), 20, 100, minimum=1)
+    offset  = clamp(request.args.get('offset'), 0, MAX_OFFSET)
+    token   = request.args.get('cursor')
 
     filters = ['qs.user_id = %s']
     params  = [user_id]
@@ -381,19 +577,39 @@ def my_session_history():
     if status:
         filters.append('qs.status = %s')
         params.append(status)
+    if token:
+        try:
+            started_at, last_id = decode_cursor(token, 2)
+        except InvalidCursor:
+            return jsonify({'Status': 'invalid cursor'}), 400
+        # seek past the last row served, walking idx_session_user_started
+        filters.append('(qs.started_at < %s OR (qs.started_at = %s AND qs.id < %s))')
+        params.extend([started_at, started_at, last_id])
+        offset = 0
 
     where_clause = 'WHERE ' + ' AND '.join(filters)
+    # read before checking out a connection: a snapshot reload needs its own
+    catalog_tag = catalog_cache.snapshot().quizzes_tag
 
-    conn = connect_db()
-    try:
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
-        cursor.execute('USE Bhasabridge')
+    with db_cursor() as cursor:
+        # any new, submitted or abandoned session moves MAX(updated_at); the
+        # question text shown per attempt comes from the catalog
+        cursor.execute(
+            'SELECT COUNT(*) AS n, MAX(updated_at) AS changed FROM quiz_sessions WHERE user_id=%s',
+            (user_id,),
+        )
+        version = cursor.fetchone()
+        etag = etag_for(user_id, version['n'], version['changed'], catalog_tag)
+        cached = not_modified(etag, HISTORY_CACHE_CONTROL)
+        if cached:
+            return cached
 
         cursor.execute(
             f'''
             SELECT
                 qs.id           AS session_id,
                 qs.level,
+                qs.mode,
                 qs.total_questions,
                 qs.correct_answers,
                 qs.score_percent,
@@ -402,12 +618,16 @@ def my_session_history():
                 qs.completed_at
             FROM quiz_sessions qs
             {where_clause}
-            ORDER BY qs.started_at DESC
+            ORDER BY qs.started_at DESC, qs.id DESC
             LIMIT %s OFFSET %s
             ''',
-            params + [limit, offset],
+            params + [limit + 1, offset],
         )
         rows = cursor.fetchall()
+        headers = {}
+        if len(rows) > limit:
+            rows = rows[:limit]
+            headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1]['started_at'], rows[-1]['session_id'])
 
         # per-session attempt detail (only the ids fetched)
         if rows:
@@ -438,10 +658,31 @@ def my_session_history():
             for r in rows:
                 r['attempts'] = attempt_map.get(r['session_id'], [])
 
+        return tag_response(jsonify(rows), etag, HISTORY_CACHE_CONTROL), 200, headers
+
+
+# ---------------------------------------------------------------------------
+# GET /api/progress/me/rank  – learner's own leaderboard position
+# ---------------------------------------------------------------------------
+@progress.route('/progress/me/rank', methods=['GET'])
+@login_required
+def my_rank():
+    """
+    Leaderboard position of the logged-in user.
+    Query param: level (optional, returns every level played if omitted)
+    """
+    level = request.args.get('level')
+    if level and level not in VALID_LEVELS:
+        return jsonify({'Status': 'level must be easy, intermediate, or hard'}), 400
+
+    user_id = session['user_id']
+    with db_cursor() as cursor:
+        rows = []
+        for lvl in ([level] if level else VALID_LEVELS):
+            row = rank_of(cursor, user_id, lvl)
+            if row:
+                rows.append(row)
         return jsonify(rows), 200
-    finally:
-        cursor.close()
-        conn.close()
 
 
 # ===========================================================================
@@ -452,130 +693,75 @@ def my_session_history():
 # GET /api/admin/analytics  – all users summary
 # ---------------------------------------------------------------------------
 @progress.route('/admin/analytics', methods=['GET'])
-@login_required
+@admin_required
 def admin_analytics():
-    """Admin: per-user quiz statistics summary."""
-    conn = connect_db()
-    try:
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
-        cursor.execute('USE Bhasabridge')
-
-        if not _is_admin(cursor, session['user_id']):
-            return jsonify({'Status': 'forbidden'}), 403
-
-        cursor.execute(
-            '''
-            SELECT
-                u.id           AS user_id,
-                u.name,
-                u.email,
-                u.role,
-                COUNT(DISTINCT qs.id)                            AS total_sessions,
-                COALESCE(SUM(qs.total_questions), 0)             AS total_questions_attempted,
-                COALESCE(SUM(qs.correct_answers), 0)             AS total_correct,
-                COALESCE(ROUND(AVG(qs.score_percent), 2), 0)     AS avg_score_percent,
-                COALESCE(MAX(qs.score_percent), 0)               AS best_score_percent,
-                MAX(qs.completed_at)                             AS last_played_at
-            FROM users u
-            LEFT JOIN quiz_sessions qs
-                   ON qs.user_id = u.id AND qs.status = 'completed'
-            GROUP BY u.id
-            ORDER BY avg_score_percent DESC, total_sessions DESC
-            '''
-        )
+    """
+    Admin: per-user quiz statistics summary.
+    Query param: format (json (default), ndjson or csv; the latter two stream)
+    """
+    fmt = (request.args.get('format') or 'json').lower()
+    if fmt != 'json' and fmt not in EXPORT_FORMATS:
+        return jsonify({'Status': 'format must be json, ndjson, or csv'}), 400
+
+    sql = f'''
+        SELECT
+            u.id           AS user_id,
+            u.name,
+            u.email,
+            u.role,
+            {SUMMARY_COLUMNS}
+        FROM users u
+        LEFT JOIN user_progress_summary ps ON ps.user_id = u.id
+        ORDER BY avg_score_percent DESC, total_sessions DESC
+    '''
+    if fmt != 'json':
+        return stream_export(sql, (), fmt, 'analytics')
+
+    with db_cursor() as cursor:
+        cursor.execute(sql)
         rows = cursor.fetchall()
         return jsonify(rows), 200
-    finally:
-        cursor.close()
-        conn.close()
 
 
 # ---------------------------------------------------------------------------
 # GET /api/admin/analytics/leaderboard  – top scorers per level
 # ---------------------------------------------------------------------------
 @progress.route('/admin/analytics/leaderboard', methods=['GET'])
-@login_required
+@admin_required
 def admin_leaderboard():
     """
-    Admin: top 10 users per level ranked by best score, then accuracy.
-    Query param: level (optional, returns all levels if omitted)
+    Admin: top users per level ranked by best score, then correct answers.
+    Query params: level (optional, returns all levels if omitted),
+                  limit (default 10, max 100), offset (default 0, max MAX_OFFSET)
     """
     level = request.args.get('level')
-    conn = connect_db()
-    try:
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
-        cursor.execute('USE Bhasabridge')
-
-        if not _is_admin(cursor, session['user_id']):
-            return jsonify({'Status': 'forbidden'}), 403
-
-        extra_filter = 'AND ulp.level=%s' if level else ''
-        params = [level] if level else []
+    limit = clamp(request.args.get('limit'), 10, 100, minimum=1)
+    offset = clamp(request.args.get('offset'), 0, MAX_OFFSET)
+    if level and level not in VALID_LEVELS:
+        return jsonify({'Status': 'level must be easy, intermediate, or hard'}), 400
 
-        cursor.execute(
-            f'''
-            SELECT
-                ulp.level,
-                u.id           AS user_id,
-                u.name,
-                ulp.total_sessions,
-                ulp.total_questions_answered,
-                ulp.total_correct,
-                CASE WHEN ulp.total_questions_answered > 0
-                     THEN ROUND((ulp.total_correct / ulp.total_questions_answered) * 100, 2)
-                     ELSE 0
-                END AS overall_accuracy_percent,
-                ulp.best_score_percent,
-                ulp.last_played_at,
-                RANK() OVER (
-                    PARTITION BY ulp.level
-                    ORDER BY ulp.best_score_percent DESC,
-                             ulp.total_correct DESC
-                ) AS rank_in_level
-            FROM user_level_progress ulp
-            JOIN users u ON u.id = ulp.user_id
-            WHERE ulp.total_sessions > 0
-            {extra_filter}
-            ORDER BY FIELD(ulp.level, 'easy', 'intermediate', 'hard'), rank_in_level
-            ''',
-            params,
-        )
-        rows = cursor.fetchall()
+    with db_cursor() as cursor:
+        rows = []
+        for lvl in ([level] if level else VALID_LEVELS):
+            rows.extend(leaderboard_page(cursor, lvl, limit, offset))
         return jsonify(rows), 200
-    finally:
-        cursor.close()
-        conn.close()
 
 
 # ---------------------------------------------------------------------------
 # GET /api/admin/analytics/user/<user_id>  – specific user full detail
 # ---------------------------------------------------------------------------
 @progress.route('/admin/analytics/user/<int:target_user_id>', methods=['GET'])
-@login_required
+@admin_required
 def admin_user_detail(target_user_id):
     """Admin: full progress detail for a specific user."""
-    conn = connect_db()
-    try:
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
-        cursor.execute('USE Bhasabridge')
-
-        if not _is_admin(cursor, session['user_id']):
-            return jsonify({'Status': 'forbidden'}), 403
-
+    with db_cursor() as cursor:
         # user overview
         cursor.execute(
-            '''
-            SELECT
-                u.id, u.name, u.email, u.role, u.created_at,
-                COUNT(DISTINCT qs.id)                         AS total_sessions,
-                COALESCE(SUM(qs.total_questions), 0)          AS total_questions_attempted,
-                COALESCE(SUM(qs.correct_answers), 0)          AS total_correct,
-                COALESCE(ROUND(AVG(qs.score_percent), 2), 0)  AS avg_score_percent,
-                COALESCE(MAX(qs.score_percent), 0)            AS best_score_percent
+            f'''
+            SELECT u.id, u.name, u.email, u.role, u.created_at, {SUMMARY_COLUMNS}
             FROM users u
-            LEFT JOIN quiz_sessions qs ON qs.user_id=u.id AND qs.status='completed'
+            LEFT JOIN user_progress_summary ps ON ps.user_id=u.id
             WHERE u.id=%s
-            GROUP BY u.id
             ''',
             (target_user_id,),
         )
@@ -617,56 +803,94 @@ def admin_user_detail(target_user_id):
         user_row['level_progress'] = level_progress
         user_row['recent_sessions'] = recent_sessions
         return jsonify(user_row), 200
-    finally:
-        cursor.close()
-        conn.close()
 
 
 # ---------------------------------------------------------------------------
 # GET /api/admin/analytics/quiz-stats  – per-question difficulty analysis
 # ---------------------------------------------------------------------------
 @progress.route('/admin/analytics/quiz-stats', methods=['GET'])
-@login_required
+@admin_required
 def admin_quiz_stats():
     """
-    Admin: per-question attempt counts and correct-rate (difficulty analysis).
-    Query param: level (optional)
+    Admin: per-question attempt counts, correct-rate and per-option picks
+    (difficulty analysis), read from the quiz_stats rollup.
+    Query params: level (optional),
+                  format (json (default), ndjson or csv; the latter two stream)
     """
     level = request.args.get('level')
-    conn = connect_db()
-    try:
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
-        cursor.execute('USE Bhasabridge')
+    fmt = (request.args.get('format') or 'json').lower()
+    if fmt != 'json' and fmt not in EXPORT_FORMATS:
+        return jsonify({'Status': 'format must be json, ndjson, or csv'}), 400
+
+    extra_filter = 'AND q.level=%s' if level else ''
+    params = [level] if level else []
+    sql = f'''
+        SELECT
+            q.id           AS quiz_id,
+            q.level,
+            q.question_text,
+            COALESCE(s.attempts, 0)                          AS total_attempts,
+            COALESCE(s.correct, 0)                           AS correct_attempts,
+            CASE WHEN s.attempts > 0
+                 THEN ROUND((s.correct / s.attempts) * 100, 2)
+                 ELSE NULL
+            END AS correct_rate_percent,
+            COALESCE(s.selected_a, 0)                        AS selected_a,
+            COALESCE(s.selected_b, 0)                        AS selected_b,
+            COALESCE(s.selected_c, 0)                        AS selected_c,
+            COALESCE(s.selected_d, 0)                        AS selected_d
+        FROM quiz q
+        LEFT JOIN quiz_stats s ON s.quiz_id = q.id
+        WHERE 1=1 {extra_filter}
+        ORDER BY FIELD(q.level, 'easy', 'intermediate', 'hard'),
+                 correct_rate_percent ASC
+    '''
+    if fmt != 'json':
+        return stream_export(sql, params, fmt, 'quiz-stats')
+
+    with db_cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        return jsonify(rows), 200
+
 
-        if not _is_admin(cursor, session['user_id']):
-            return jsonify({'Status': 'forbidden'}), 403
+# ---------------------------------------------------------------------------
+# GET /api/admin/analytics/item-analysis  – distractor / discrimination report
+# ---------------------------------------------------------------------------
+@progress.route('/admin/analytics/item-analysis', methods=['GET'])
+@admin_required
+def admin_item_analysis():
+    """
+    Admin: per-question option distribution, difficulty, point-biserial
+    discrimination and distractor flags, as last computed by
+    ``flask progress analyze-items``.
+    Query params: level (optional), quiz_id (optional)
+    """
+    level = request.args.get('level')
+    quiz_id = request.args.get('quiz_id', type=int)
+    if level and level not in VALID_LEVELS:
+        return jsonify({'Status': 'level must be easy, intermediate, or hard'}), 400
 
-        extra_filter = 'AND q.level=%s' if level else ''
-        params = [level] if level else []
+    filters = []
+    params = []
+    if level:
+        filters.append('AND q.level=%s')
+        params.append(level)
+    if quiz_id is not None:
+        filters.append('AND q.id=%s')
+        params.append(quiz_id)
 
+    with db_cursor() as cursor:
         cursor.execute(
             f'''
-            SELECT
-                q.id           AS quiz_id,
-                q.level,
-                q.question_text,
-                COUNT(qa.id)                                     AS total_attempts,
-                COALESCE(SUM(qa.is_correct), 0)                  AS correct_attempts,
-                CASE WHEN COUNT(qa.id) > 0
-                     THEN ROUND((SUM(qa.is_correct) / COUNT(qa.id)) * 100, 2)
-                     ELSE NULL
-                END AS correct_rate_percent
-            FROM quiz q
-            LEFT JOIN quiz_attempts qa ON qa.quiz_id = q.id
-            WHERE 1=1 {extra_filter}
-            GROUP BY q.id
-            ORDER BY FIELD(q.level, 'easy', 'intermediate', 'hard'),
-                     correct_rate_percent ASC
+            SELECT a.*, q.level, q.question_text, q.correct_option,
+                   q.option_a, q.option_b, q.option_c, q.option_d
+            FROM quiz_item_analysis a
+            JOIN quiz q ON q.id = a.quiz_id
+            WHERE 1=1 {' '.join(filters)}
+            ORDER BY FIELD(q.level, 'easy', 'intermediate', 'hard'), a.point_biserial ASC
             ''',
             params,
         )
         rows = cursor.fetchall()
-        return jsonify(rows), 200
-    finally:
-        cursor.close()
-        conn.close()
+        return jsonify([distractor_report(row) for row in rows]), 200
@@ -1,9 +1,10 @@
-import jwt
 import datetime
 
 from flask import current_app
 
 def generate_pasword_reset_token(user_id):
+    import jwt
+
     payload = {
         'user_id':user_id,
         'exp': datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(minutes=5)